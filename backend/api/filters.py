@@ -1,32 +1,104 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, Count, Exists, OuterRef, Q, Value, When
+from django.db.models.functions import Lower
 from django_filters import rest_framework as filters
 from rest_framework import filters as drf_filters
-from recipes.models import Recipe, User
+from recipes.models import Favorite, Follow, IngredientRecipe, Recipe, ShoppingCart, User
 
 
-class IngredientSearchFilter(drf_filters.SearchFilter):
-    """Фильтр для поиска ингредиентов по имени."""
+class IngredientSearchFilter(drf_filters.BaseFilterBackend):
+    """
+    Поиск ингредиентов по имени: сначала совпадения по началу названия
+    (индекс lower(name) text_pattern_ops), затем похожие по триграммам
+    (GIN-индекс pg_trgm) — так находятся и названия с опечатками.
+    """
     search_param = 'name'
 
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if connection.vendor != 'postgresql':
+            return queryset.filter(name__istartswith=query)
+        queryset = queryset.annotate(name_lower=Lower('name'))
+        prefix = Q(name_lower__startswith=query.lower())
+        return queryset.filter(
+            prefix | Q(name__trigram_similar=query)
+        ).annotate(
+            is_prefix=Case(When(prefix, then=Value(True)), default=Value(False)),
+            similarity=TrigramSimilarity('name', query)
+        ).order_by('-is_prefix', '-similarity', 'name')
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Список чисел через запятую."""
+
 
 class RecipeFilter(filters.FilterSet):
-    """Фильтр для рецептов с возможностью фильтрации по автору и статусу."""
-    
+    """
+    Фильтр для рецептов: автор или список авторов, время приготовления,
+    ингредиенты, подписки, избранное и список покупок.
+    Связанные таблицы проверяются подзапросами EXISTS / IN,
+    поэтому рецепты не дублируются и не требуют DISTINCT.
+    """
+
     author = filters.ModelChoiceFilter(queryset=User .objects.all())
+    authors = NumberInFilter(field_name='author_id', lookup_expr='in')
+    cooking_time = filters.RangeFilter()
+    ingredients = NumberInFilter(method='filter_by_ingredients')
+    exclude_ingredients = NumberInFilter(method='filter_by_excluded_ingredients')
+    is_subscribed = filters.BooleanFilter(method='filter_by_subscriptions')
     is_in_shopping_cart = filters.BooleanFilter(method='filter_by_shopping_cart')
     is_favorited = filters.BooleanFilter(method='filter_by_favorites')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'authors', 'cooking_time', 'ingredients',
+            'exclude_ingredients', 'is_subscribed', 'is_favorited',
+            'is_in_shopping_cart'
+        )
+
+    def filter_by_ingredients(self, queryset, name, value):
+        """Рецепты, в которых есть все перечисленные ингредиенты."""
+        ingredient_ids = set(value)
+        if not ingredient_ids:
+            return queryset
+        return queryset.filter(id__in=IngredientRecipe.objects.filter(
+            ingredient_id__in=ingredient_ids
+        ).values('recipe_id').annotate(
+            found=Count('ingredient_id')
+        ).filter(found=len(ingredient_ids)).values('recipe_id'))
+
+    def filter_by_excluded_ingredients(self, queryset, name, value):
+        """Рецепты без единого из перечисленных ингредиентов."""
+        if not value:
+            return queryset
+        return queryset.exclude(Exists(IngredientRecipe.objects.filter(
+            recipe=OuterRef('pk'), ingredient_id__in=value
+        )))
+
+    def filter_by_subscriptions(self, queryset, name, value):
+        """Рецепты авторов, на которых подписан пользователь."""
+        if value and self.request.user.is_authenticated:
+            return queryset.filter(author_id__in=Follow.objects.filter(
+                user=self.request.user
+            ).values('author_id'))
+        return queryset
 
     def filter_by_favorites(self, queryset, name, value):
         """Фильтрация по избранным рецептам."""
         if value and self.request.user.is_authenticated:
-            return queryset.filter(favorite__author=self.request.user)
+            return queryset.filter(Exists(Favorite.objects.filter(
+                author=self.request.user, recipe=OuterRef('pk')
+            )))
         return queryset
 
     def filter_by_shopping_cart(self, queryset, name, value):
         """Фильтрация по рецептам в списке покупок."""
         if value and self.request.user.is_authenticated:
-            return queryset.filter(shopping_cart__author=self.request.user)
-        return queryset
\ No newline at end of file
+            return queryset.filter(Exists(ShoppingCart.objects.filter(
+                author=self.request.user, recipe=OuterRef('pk')
+            )))
+        return queryset
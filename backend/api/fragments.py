@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from api.membership import (FAVORITES, FOLLOWS, SHOPPING_CART, memberships,
+                            next_generation, read_generation)
+from api.shared_memory import SharedSlots
+from api.serializers import RecipeFragmentSerializer, RecipeListSerializer
+from recipes.models import IngredientRecipe, Recipe
+from users.serializers import UserSerializer
+
+RECIPE_FIELDS = RecipeListSerializer.Meta.fields
+AUTHOR_FIELDS = tuple(
+    field for field in UserSerializer.Meta.fields if field != 'password'
+)
+
+# Кэш фрагментов у каждого воркера свой, поэтому рядом с фрагментом
+# хранится поколение рецепта из общей памяти: изменение в одном воркере
+# делает устаревшими копии во всех остальных.
+generations = SharedSlots(
+    settings.RECIPE_GENERATIONS_PATH,
+    settings.RECIPE_GENERATIONS_SLOTS,
+    value_format='Q'
+)
+
+
+def generation_key(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def fragment_key(recipe_id):
+    """Ключ кэша для независимой от пользователя части рецепта."""
+    return f'recipe-fragment:{recipe_id}'
+
+
+def invalidate(recipe_ids):
+    """
+    Сброс закэшированных фрагментов рецептов во всех воркерах.
+    Поколение меняется после фиксации транзакции: иначе другой воркер
+    успел бы закэшировать под новым поколением ещё старые данные.
+    """
+    recipe_ids = list(recipe_ids)
+
+    def bump():
+        for recipe_id in recipe_ids:
+            generations.update(generation_key(recipe_id), next_generation)
+        cache.delete_many([fragment_key(recipe_id) for recipe_id in recipe_ids])
+
+    transaction.on_commit(bump)
+
+
+def get_fragments(recipe_ids):
+    """
+    Фрагменты рецептов одним запросом к кэшу.
+    Недостающие и устаревшие рендерятся одной выборкой из БД
+    и кладутся в кэш вместе с поколением рецепта.
+    """
+    current = {
+        recipe_id: generations.update(generation_key(recipe_id), read_generation)
+        for recipe_id in recipe_ids
+    }
+    keys = {fragment_key(recipe_id): recipe_id for recipe_id in recipe_ids}
+    fragments = {
+        keys[key]: fragment
+        for key, (generation, fragment) in cache.get_many(keys).items()
+        if generation == current[keys[key]]
+    }
+    missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in fragments]
+    if missing:
+        recipes = Recipe.objects.filter(id__in=missing).select_related(
+            'author'
+        ).prefetch_related(
+            Prefetch(
+                'recipe_ingredients',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            )
+        )
+        rendered = {
+            fragment['id']: fragment
+            for fragment in RecipeFragmentSerializer(recipes, many=True).data
+        }
+        cache.set_many(
+            {
+                fragment_key(recipe_id): (current[recipe_id], fragment)
+                for recipe_id, fragment in rendered.items()
+            },
+            settings.RECIPE_FRAGMENT_TIMEOUT
+        )
+        fragments.update(rendered)
+    return fragments
+
+
+def absolute(request, url):
+    """Абсолютный адрес файла, как у ImageField с запросом в контексте."""
+    return request.build_absolute_uri(url) if url else url
+
+
+def render_recipes(request, recipe_ids):
+    """
+    Рецепты в формате RecipeListSerializer: фрагменты из кэша
+    с подставленными признаками текущего пользователя из кэша наборов.
+    Отсутствующие в БД рецепты пропускаются, порядок сохраняется.
+    """
+    fragments = get_fragments(recipe_ids)
+    user = request.user
+    membership = None if user.is_anonymous else memberships.get(user.id)
+
+    def has(kind, object_id):
+        return membership is not None and membership.has(kind, object_id)
+
+    recipes = []
+    for recipe_id in recipe_ids:
+        fragment = fragments.get(recipe_id)
+        if fragment is None:
+            continue
+        author = dict(
+            fragment['author'],
+            is_subscribed=has(FOLLOWS, fragment['author']['id']),
+            avatar=absolute(request, fragment['author']['avatar'])
+        )
+        recipe = dict(
+            fragment,
+            author={field: author[field] for field in AUTHOR_FIELDS},
+            is_favorited=has(FAVORITES, recipe_id),
+            is_in_shopping_cart=has(SHOPPING_CART, recipe_id),
+            image=absolute(request, fragment['image'])
+        )
+        recipes.append({field: recipe[field] for field in RECIPE_FIELDS})
+    return recipes
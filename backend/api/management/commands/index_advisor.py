@@ -0,0 +1,188 @@
+import json
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+SORT_KEY = re.compile(r'^(?:\w+\.)?"?(\w+)"?( DESC)?$')
+
+
+class Rollback(Exception):
+    """Откат транзакции после EXPLAIN ANALYZE."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает журнал медленных запросов: выполняет '
+        'EXPLAIN (ANALYZE, BUFFERS) и предлагает недостающие индексы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log', default=settings.SLOW_QUERY_LOG,
+            help='Путь к журналу медленных запросов.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько самых медленных запросов разбирать.'
+        )
+        parser.add_argument(
+            '--min-rows-removed', type=int, default=1000,
+            help='Порог отброшенных фильтром строк для предложения индекса.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Команда работает только с PostgreSQL.')
+        self.min_rows_removed = options['min_rows_removed']
+        self.tables = {
+            model._meta.db_table: model for model in apps.get_models()
+        }
+        proposals = {}
+        for query in self.load(options['log'])[:options['limit']]:
+            plan = self.explain(query['sql'], query['params'])
+            if plan is None:
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{query["count"]} x {query["duration_ms"]:.0f} мс, '
+                f'{query["view"]}, {query["frame"]}'
+            ))
+            self.stdout.write(f'  {query["sql"][:300]}')
+            self.stdout.write(
+                f'  Выполнение: {plan["Execution Time"]:.1f} мс, '
+                f'буферы: hit={plan["Plan"].get("Shared Hit Blocks", 0)} '
+                f'read={plan["Plan"].get("Shared Read Blocks", 0)}'
+            )
+            for proposal in self.advise(plan['Plan']):
+                proposals.setdefault(proposal[:2], proposal)
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS('Новых индексов не нужно.'))
+            return
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            '\nПредлагаемые операции миграций:'
+        ))
+        for model, fields, note, btree in proposals.values():
+            if not btree:
+                self.stdout.write(f'# {model._meta.label} {list(fields)}: {note}')
+                continue
+            name = f'{model._meta.model_name}_{"_".join(f.lstrip("-") for f in fields)}_idx'[:30]
+            self.stdout.write(
+                f'# {model._meta.app_label}: {note}\n'
+                f'migrations.AddIndex(\n'
+                f'    model_name={model._meta.model_name!r},\n'
+                f'    index=models.Index(fields={list(fields)!r}, name={name!r}),\n'
+                f'),'
+            )
+
+    def load(self, path):
+        """Запросы из журнала, сгруппированные по тексту SQL."""
+        queries = defaultdict(lambda: {'count': 0, 'duration_ms': 0})
+        try:
+            with open(path) as log:
+                for line in log:
+                    entry = json.loads(line)
+                    # Без строковых параметров EXPLAIN ANALYZE
+                    # выполнил бы другой запрос.
+                    if entry['params'] is None or entry.get('redacted'):
+                        continue
+                    query = queries[IN_LIST.sub('IN (...)', entry['sql'])]
+                    query['count'] += 1
+                    if entry['duration_ms'] >= query['duration_ms']:
+                        query.update(entry)
+        except FileNotFoundError:
+            raise CommandError(f'Журнал {path} не найден.')
+        return sorted(
+            queries.values(),
+            key=lambda query: query['count'] * query['duration_ms'],
+            reverse=True
+        )
+
+    def explain(self, sql, params):
+        """EXPLAIN ANALYZE только для SELECT, в откатываемой транзакции."""
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return None
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + sql,
+                        params
+                    )
+                    plan = cursor.fetchone()[0]
+                raise Rollback
+        except Rollback:
+            pass
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]
+
+    def advise(self, node, sort_keys=()):
+        """
+        Обход плана: последовательное чтение с фильтром, отбросившим
+        много строк, — кандидат на индекс по колонкам фильтра
+        и ключам сортировки над ним.
+        """
+        if node['Node Type'] == 'Sort':
+            sort_keys = node.get('Sort Key', ())
+        if (node['Node Type'] == 'Seq Scan' and 'Filter' in node
+                and node.get('Rows Removed by Filter', 0)
+                >= self.min_rows_removed):
+            proposal = self.propose(
+                node['Relation Name'], node['Filter'], sort_keys
+            )
+            if proposal:
+                yield proposal
+        for child in node.get('Plans', ()):
+            yield from self.advise(child, sort_keys)
+
+    def propose(self, table, condition, sort_keys):
+        model = self.tables.get(table)
+        if model is None:
+            return None
+        columns = {
+            field.column: field.name
+            for field in model._meta.concrete_fields
+        }
+        fields = [
+            name for column, name in columns.items()
+            if re.search(rf'\b{column}\b', condition)
+        ]
+        if not fields:
+            return None
+        if re.search(r'(upper|lower)\(.*~~', condition):
+            return (
+                model, tuple(fields),
+                'поиск по шаблону без учёта регистра: обычный btree '
+                'не подойдёт, нужен индекс по lower() с text_pattern_ops '
+                'или GIN с gin_trgm_ops (RunSQL)', False
+            )
+        for key in sort_keys:
+            match = SORT_KEY.match(key)
+            if match and match.group(1) in columns:
+                name = columns[match.group(1)]
+                if name not in fields:
+                    fields.append(('-' if match.group(2) else '') + name)
+        if self.indexed(table, [f.lstrip('-') for f in fields], columns):
+            return None
+        return (
+            model, tuple(fields),
+            f'последовательное чтение {table} с фильтром {condition}', True
+        )
+
+    def indexed(self, table, fields, columns):
+        """Есть ли индекс, начинающийся с этих колонок."""
+        names = {name: column for column, name in columns.items()}
+        wanted = [names[field] for field in fields]
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, table
+            )
+        return any(
+            (constraint['index'] or constraint['unique'])
+            and constraint['columns'][:len(wanted)] == wanted
+            for constraint in constraints.values()
+        )
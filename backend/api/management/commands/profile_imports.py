@@ -0,0 +1,98 @@
+import os
+import re
+import resource
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+# Загрузка как у воркера gunicorn: WSGI-приложение и URLconf со всеми вьюхами.
+BOOT_CODE = (
+    'import foodgram.wsgi\n'
+    'from django.urls import get_resolver\n'
+    'get_resolver().url_patterns\n'
+)
+# Модули приложений импортируются только после настройки Django.
+SETUP_CODE = 'import django\ndjango.setup()\n'
+
+
+class Command(BaseCommand):
+    help = (
+        'Профилирование запуска: время импорта каждого модуля '
+        '(python -X importtime) и пиковая память процесса '
+        'при загрузке приложения в отдельном интерпретаторе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=25,
+            help='Сколько самых дорогих модулей и пакетов показать.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Число запусков, берётся самый быстрый.'
+        )
+        parser.add_argument(
+            '--module', action='append', default=[],
+            help=(
+                'Импортировать модуль после django.setup() '
+                'вместо полной загрузки приложения.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        code = BOOT_CODE
+        if options['module']:
+            code = SETUP_CODE + ''.join(
+                f'import {module}\n' for module in options['module']
+            )
+        runs = [self.run(code) for _ in range(options['repeat'])]
+        modules, rss = min(runs, key=lambda run: sum(
+            own for own, _, _ in run[0].values()
+        ))
+
+        packages = defaultdict(int)
+        for name, (own, _, _) in modules.items():
+            packages[name.split('.')[0]] += own
+        total = sum(packages.values())
+        top = options['top']
+
+        self.stdout.write(f'Модулей: {len(modules)}, импорт: {total / 1000:.1f} мс, '
+                          f'пиковая память: {rss / 1024:.1f} МБ')
+        self.stdout.write('\nПакеты по собственному времени импорта, мс:')
+        for name, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'{own / 1000:10.1f}  {name}')
+        self.stdout.write('\nМодули верхнего уровня по полному времени импорта, мс:')
+        roots = [
+            (cumulative, name) for name, (_, cumulative, depth) in modules.items()
+            if depth == 0
+        ]
+        for cumulative, name in sorted(roots, reverse=True)[:top]:
+            self.stdout.write(f'{cumulative / 1000:10.1f}  {name}')
+
+    def run(self, code):
+        """Запуск интерпретатора с -X importtime, разбор вывода и память."""
+        before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            env=os.environ.copy(), capture_output=True, text=True
+        )
+        if process.returncode:
+            errors = [
+                line for line in process.stderr.splitlines()
+                if line.strip() and not line.startswith('import time:')
+            ]
+            raise CommandError(
+                errors[-1] if errors
+                else f'Интерпретатор завершился с кодом {process.returncode}'
+            )
+        rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        modules = {}
+        for line in process.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                own, cumulative, indent, name = match.groups()
+                modules[name] = (int(own), int(cumulative), len(indent) // 2)
+        return modules, max(rss, before)
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.utils import OperationalError
+
+STATIC_HASH_FILE = '.collectstatic-hash'
+
+
+class Command(BaseCommand):
+    help = (
+        'Подготовка контейнера к запуску: ожидание БД, миграции '
+        'и collectstatic только при необходимости.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--db-timeout', type=float, default=60,
+            help='Сколько секунд ждать готовности БД.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        for step in (self.wait_for_db, self.migrate, self.collectstatic):
+            step_started = time.monotonic()
+            message = step(options)
+            self.stdout.write(
+                f'{message} ({time.monotonic() - step_started:.2f} с)'
+            )
+        connection.close()
+        self.stdout.write(self.style.SUCCESS(
+            f'Подготовка завершена за {time.monotonic() - started:.2f} с'
+        ))
+
+    def wait_for_db(self, options):
+        """Ожидание БД с экспоненциальной задержкой между попытками."""
+        deadline = time.monotonic() + options['db_timeout']
+        delay = 0.1
+        while True:
+            try:
+                connection.ensure_connection()
+                return 'БД доступна'
+            except OperationalError as error:
+                if time.monotonic() + delay > deadline:
+                    raise CommandError(f'БД недоступна: {error}')
+                time.sleep(delay)
+                delay = min(delay * 2, 2)
+
+    def migrate(self, options):
+        """Применение миграций, только если план не пуст."""
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan:
+            return 'Миграции уже применены'
+        call_command('migrate', interactive=False, verbosity=0)
+        return f'Применено миграций: {len(plan)}'
+
+    def collectstatic(self, options):
+        """Сбор статики, только если исходные файлы изменились."""
+        # Смена хранилища (STATIC_MANIFEST) тоже требует пересборки.
+        digest = hashlib.sha256(settings.STATICFILES_STORAGE.encode())
+        for finder in get_finders():
+            for path, storage in finder.list([]):
+                stat = os.stat(storage.path(path))
+                digest.update(
+                    f'{path}:{stat.st_size}:{stat.st_mtime_ns}\n'.encode()
+                )
+        digest = digest.hexdigest()
+        hash_file = os.path.join(settings.STATIC_ROOT, STATIC_HASH_FILE)
+        if os.path.exists(hash_file):
+            with open(hash_file) as file:
+                if file.read() == digest:
+                    return 'Статика не изменилась'
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(hash_file, 'w') as file:
+            file.write(digest)
+        return 'Статика собрана'
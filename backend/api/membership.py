@@ -0,0 +1,152 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import IntegerField, Value
+
+from api.shared_memory import SharedSlots
+from recipes.models import Favorite, Follow, ShoppingCart
+
+FAVORITES, SHOPPING_CART, FOLLOWS = 'favorites', 'shopping_cart', 'follows'
+MODEL_KINDS = {
+    Favorite: FAVORITES,
+    ShoppingCart: SHOPPING_CART,
+    Follow: FOLLOWS,
+}
+
+# Поколение набора пользователя общее для всех воркеров на хосте:
+# изменение в одном воркере делает устаревшими копии в остальных.
+generations = SharedSlots(
+    settings.MEMBERSHIP_GENERATIONS_PATH,
+    settings.MEMBERSHIP_GENERATIONS_SLOTS,
+    value_format='Q'
+)
+
+
+def generation_key(user_id):
+    return f'membership:{user_id}'
+
+
+def read_generation(values):
+    """Текущее поколение; для новой или вытесненной записи — новое."""
+    generation = values[0] if values else time.time_ns()
+    return (generation,), generation
+
+
+def next_generation(values):
+    """Новое поколение, результат — пара (старое, новое)."""
+    old = values[0] if values else None
+    new = max(time.time_ns(), (old or 0) + 1)
+    return (new,), (old, new)
+
+
+class Membership:
+    """
+    Избранное, список покупок и подписки пользователя
+    в виде отсортированных массивов id.
+    """
+    __slots__ = ('generation', 'loaded', FAVORITES, SHOPPING_CART, FOLLOWS)
+
+    def __init__(self, generation, favorites, shopping_cart, follows):
+        self.generation = generation
+        self.loaded = time.monotonic()
+        self.favorites = array('Q', sorted(favorites))
+        self.shopping_cart = array('Q', sorted(shopping_cart))
+        self.follows = array('Q', sorted(follows))
+
+    def has(self, kind, object_id):
+        """Проверка id в наборе двоичным поиском, без запросов к БД."""
+        ids = getattr(self, kind)
+        index = bisect_left(ids, object_id)
+        return index < len(ids) and ids[index] == object_id
+
+    def patch(self, kind, object_ids, added):
+        """Изменение набора на месте после записи в БД."""
+        ids = getattr(self, kind)
+        for object_id in object_ids:
+            index = bisect_left(ids, object_id)
+            present = index < len(ids) and ids[index] == object_id
+            if added and not present:
+                ids.insert(index, object_id)
+            elif not added and present:
+                del ids[index]
+
+
+class MembershipCache:
+    """
+    Ограниченный LRU-кэш наборов пользователей в памяти воркера.
+    Перед выдачей копия сверяется с поколением в общей памяти,
+    изменения через API патчат копию на месте. Записи в обход API
+    (админка, каскадное удаление) становятся видны через MEMBERSHIP_TTL.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        """Наборы пользователя: из памяти или одним запросом к БД."""
+        generation = generations.update(generation_key(user_id), read_generation)
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if (
+                entry is not None and entry.generation == generation
+                and time.monotonic() - entry.loaded < self.ttl
+            ):
+                self.entries.move_to_end(user_id)
+                return entry
+        entry = self.load(user_id, generation)
+        if self.size:
+            with self.lock:
+                self.entries[user_id] = entry
+                self.entries.move_to_end(user_id)
+                while len(self.entries) > self.size:
+                    self.entries.popitem(last=False)
+        return entry
+
+    def load(self, user_id, generation):
+        """Загрузка всех трёх наборов одним запросом UNION ALL."""
+        def rows(queryset, kind, column):
+            return queryset.annotate(
+                kind=Value(kind, output_field=IntegerField())
+            ).values_list(column, 'kind').order_by()
+
+        kinds = (FAVORITES, SHOPPING_CART, FOLLOWS)
+        ids = {kind: [] for kind in kinds}
+        query = rows(Favorite.objects.filter(author_id=user_id), 0, 'recipe_id').union(
+            rows(ShoppingCart.objects.filter(author_id=user_id), 1, 'recipe_id'),
+            rows(Follow.objects.filter(user_id=user_id), 2, 'author_id'),
+            all=True
+        )
+        for object_id, kind in query:
+            ids[kinds[kind]].append(object_id)
+        return Membership(generation, **ids)
+
+    def changed(self, user_id, kind, object_ids, added):
+        """
+        Отметка изменения набора после записи в БД: новое поколение
+        для всех воркеров и патч локальной копии, если до этого её
+        никто не успел изменить, иначе копия сбрасывается.
+        """
+        if not object_ids:
+            return
+        with self.lock:
+            old, new = generations.update(generation_key(user_id), next_generation)
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return
+            if entry.generation != old:
+                del self.entries[user_id]
+                return
+            entry.patch(kind, object_ids, added)
+            entry.generation = new
+
+
+memberships = MembershipCache(
+    settings.MEMBERSHIP_CACHE_SIZE, settings.MEMBERSHIP_TTL
+)
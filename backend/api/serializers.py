@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from recipes.models import Recipe, Ingredient, IngredientRecipe, ShoppingCart, Favorite
+from api.membership import FAVORITES, SHOPPING_CART, memberships
+from recipes.models import Recipe, Ingredient, IngredientRecipe, ShoppingCart, Favorite, RecipeSimilarity
+from recipes.similarity import refresh_recipe
 from users.serializers import UserSerializer
 
 
@@ -29,6 +30,19 @@ class ShoppingCartSerializer(BaseRecipeSerializer):
         model = ShoppingCart
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Сериализатор списка id рецептов для массовых операций."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500
+    )
+
+    def validate_ids(self, value):
+        """Удаление повторов с сохранением порядка."""
+        return list(dict.fromkeys(value))
+
+
 class IngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Ingredient."""
     class Meta:
@@ -61,13 +75,35 @@ class RecipeListSerializer(serializers.ModelSerializer):
 
     def get_is_favorited(self, obj):
         """Проверка, находится ли рецепт в избранном."""
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context.get('request').user
-        return not user.is_anonymous and Favorite.objects.filter(recipe=obj).exists()
+        return not user.is_anonymous and memberships.get(user.id).has(FAVORITES, obj.id)
 
     def get_is_in_shopping_cart(self, obj):
         """Проверка, находится ли рецепт в списке покупок."""
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context.get('request').user
-        return not user.is_anonymous and ShoppingCart.objects.filter(recipe=obj).exists()
+        return not user.is_anonymous and memberships.get(user.id).has(SHOPPING_CART, obj.id)
+
+
+class AuthorFragmentSerializer(UserSerializer):
+    """Автор рецепта без признака подписки текущего пользователя."""
+    is_subscribed = None
+
+    class Meta(UserSerializer.Meta):
+        fields = ('email', 'id', 'username', 'first_name', 'last_name', 'avatar')
+
+
+class RecipeFragmentSerializer(RecipeListSerializer):
+    """Не зависящая от пользователя часть рецепта для кэша фрагментов."""
+    author = AuthorFragmentSerializer()
+    is_favorited = None
+    is_in_shopping_cart = None
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = ('id', 'author', 'ingredients', 'name', 'image', 'text', 'cooking_time')
 
 
 class AddIngredientSerializer(serializers.ModelSerializer):
@@ -83,13 +119,19 @@ class AddIngredientSerializer(serializers.ModelSerializer):
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для модели Recipe - запись / обновление / удаление данных."""
     ingredients = AddIngredientSerializer(many=True, write_only=True)
-    image = Base64ImageField()
     author = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
     class Meta:
         model = Recipe
         fields = ('ingredients', 'image', 'name', 'text', 'cooking_time', 'author')
 
+    def get_fields(self):
+        """Поле image из drf_extra_fields: импорт откладывается до первой записи."""
+        from drf_extra_fields.fields import Base64ImageField
+        fields = super().get_fields()
+        fields['image'] = Base64ImageField()
+        return fields
+
     def validate_ingredients(self, value):
         """Валидация ингредиентов."""
         if not value:
@@ -116,12 +158,16 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         IngredientRecipe.objects.bulk_create(
             [IngredientRecipe(recipe=recipe, ingredient=ingredient['id'], amount=ingredient['amount']) for ingredient in ingredients]
         )
+        # bulk_create не отправляет post_save, фрагмент сбрасывается явно.
+        from api.fragments import invalidate
+        invalidate([recipe.id])
 
     def create(self, validated_data):
         """Создание нового рецепта."""
         ingredients = validated_data.pop('ingredients')
         recipe = super().create(validated_data)
         self.add_tags_ingredients(ingredients, recipe)
+        refresh_recipe(recipe.id)
         return recipe
 
     def update(self, instance, validated_data):
@@ -129,6 +175,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop('ingredients')
         instance.ingredients.clear()
         self.add_tags_ingredients(ingredients, instance)
+        refresh_recipe(instance.id)
         return super().update(instance, validated_data)
 
 
@@ -137,3 +184,15 @@ class RecipeMiniSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'cooking_time', 'image')
+
+
+class SimilarRecipeSerializer(serializers.ModelSerializer):
+    """Сериализатор похожего рецепта с коэффициентом сходства."""
+    id = serializers.ReadOnlyField(source='similar.id')
+    name = serializers.ReadOnlyField(source='similar.name')
+    image = serializers.ImageField(source='similar.image')
+    cooking_time = serializers.ReadOnlyField(source='similar.cooking_time')
+
+    class Meta:
+        model = RecipeSimilarity
+        fields = ('id', 'name', 'image', 'cooking_time', 'score')
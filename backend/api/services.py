@@ -1,31 +1,106 @@
-from django.db.models import Sum
+from django.db import connection
 from datetime import date
 from django.http import HttpResponse
-from recipes.models import IngredientRecipe
+from recipes.models import IngredientRecipe, Recipe
+from api.units import shopping_list_rows
+
+ADDED = 'added'
+REMOVED = 'removed'
+ALREADY_EXISTS = 'exists'
+NOT_FOUND = 'not_found'
 
 
 def download_shopping_cart(request, author):
     """Скачивание списка продуктов для выбранных рецептов пользователя."""
-    ingredients_summary = IngredientRecipe.objects.filter(
-        recipe__shopping_cart__author=author
-    ).values(
-        'ingredient__name', 'ingredient__measurement_unit'
-    ).annotate(
-        total_amount=Sum('amount', distinct=True)
-    ).order_by('total_amount')
+    rows = shopping_list_rows(
+        IngredientRecipe.objects.filter(recipe__shopping_cart__author=author),
+        rounding=request.query_params.get('rounding', 'exact')
+    )
 
     today = date.today().strftime("%d-%m-%Y")
     shopping_list = f'Список покупок на: {today}\n\n'
 
-    for ingredient in ingredients_summary:
-        shopping_list += (
-            f'{ingredient["ingredient__name"]} - '
-            f'{ingredient["total_amount"]} '
-            f'{ingredient["ingredient__measurement_unit"]}\n'
-        )
+    for name, amount, unit in rows:
+        shopping_list += f'{name} - {amount} {unit}\n'
 
     shopping_list += '\n\nFoodgram (2025)'
     filename = 'shopping_list.txt'
     response = HttpResponse(shopping_list, content_type='text/plain')
     response['Content-Disposition'] = f'attachment; filename={filename}'
-    return response
\ No newline at end of file
+    return response
+
+
+def create_if_absent(model, **values):
+    """
+    Создание записи одним запросом INSERT ... ON CONFLICT DO NOTHING RETURNING.
+    Возвращает созданный объект или None, если запись уже существует.
+    """
+    obj = model(**values)
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    params = [
+        field.get_db_prep_save(field.pre_save(obj, True), connection)
+        for field in fields
+    ]
+    quote_name = connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {quote_name(model._meta.db_table)} '
+        f'({", ".join(quote_name(field.column) for field in fields)}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))}) '
+        f'ON CONFLICT DO NOTHING '
+        f'RETURNING {quote_name(model._meta.pk.column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    obj.pk = row[0]
+    obj._state.adding = False
+    obj._state.db = connection.alias
+    return obj
+
+
+def bulk_add_recipes(model, author, recipe_ids):
+    """
+    Массовое добавление рецептов в избранное или список покупок.
+    Возвращает результат по каждому id в порядке запроса.
+    """
+    found = set(
+        Recipe.objects.filter(id__in=recipe_ids).values_list('id', flat=True)
+    )
+    present = set(
+        model.objects.filter(
+            author=author, recipe_id__in=found
+        ).values_list('recipe_id', flat=True)
+    )
+    model.objects.bulk_create(
+        [model(author=author, recipe_id=pk) for pk in found - present],
+        ignore_conflicts=True
+    )
+    outcomes = []
+    for pk in recipe_ids:
+        if pk not in found:
+            outcome = NOT_FOUND
+        elif pk in present:
+            outcome = ALREADY_EXISTS
+        else:
+            outcome = ADDED
+        outcomes.append({'id': pk, 'status': outcome})
+    return outcomes
+
+
+def bulk_remove_recipes(model, author, recipe_ids):
+    """
+    Массовое удаление рецептов из избранного или списка покупок
+    одним запросом DELETE ... WHERE recipe_id IN (...).
+    """
+    queryset = model.objects.filter(author=author, recipe_id__in=recipe_ids)
+    present = set(queryset.values_list('recipe_id', flat=True))
+    queryset.delete()
+    return [
+        {'id': pk, 'status': REMOVED if pk in present else NOT_FOUND}
+        for pk in recipe_ids
+    ]
@@ -0,0 +1,127 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+
+
+class SharedFile:
+    """
+    Файл, отображённый в память и общий для всех процессов на хосте.
+    После форка каждый процесс открывает своё отображение,
+    изменения защищаются блокировками fcntl.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.mmap = None
+        self.fd = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def open(self):
+        """Открытие файла, в каждом процессе — своё отображение."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < self.size:
+            os.ftruncate(fd, self.size)
+        self.mmap = mmap.mmap(fd, self.size, mmap.MAP_SHARED)
+        self.fd = fd
+        self.pid = os.getpid()
+
+    @contextmanager
+    def locked(self, start=0, length=0):
+        """Монопольный доступ к участку файла (по умолчанию — ко всему)."""
+        with self.lock:
+            if self.pid != os.getpid():
+                self.open()
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, length, start)
+            try:
+                yield self.mmap
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, length, start)
+
+
+class SharedSlots(SharedFile):
+    """
+    Таблица записей фиксированного размера в файле, отображённом в память.
+    Общая для всех процессов на хосте (например, воркеров gunicorn).
+    Запись ищется по хешу ключа среди нескольких соседних слотов,
+    на время обновления слоты блокируются через fcntl.
+    """
+    PROBES = 4
+
+    def __init__(self, path, slots, value_format):
+        self.slots = slots
+        self.record = struct.Struct('=Q' + value_format)
+        super().__init__(path, slots * self.record.size)
+
+    def update(self, key, func):
+        """
+        Атомарное обновление записи по ключу.
+        func получает текущие значения (или None для новой записи)
+        и возвращает пару: новые значения и результат вызова.
+        """
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        key_hash = int.from_bytes(digest, 'little') | 1
+        first = key_hash % (self.slots - self.PROBES + 1)
+        start = first * self.record.size
+        length = self.PROBES * self.record.size
+        with self.locked(start, length):
+            offset, values = self.find(key_hash, start)
+            values, result = func(values)
+            self.record.pack_into(self.mmap, offset, key_hash, *values)
+        return result
+
+    def find(self, key_hash, start):
+        """
+        Поиск слота с ключом или свободного слота.
+        Если все слоты заняты, вытесняется первый из них.
+        """
+        free = None
+        for probe in range(self.PROBES):
+            offset = start + probe * self.record.size
+            stored_hash, *values = self.record.unpack_from(self.mmap, offset)
+            if stored_hash == key_hash:
+                return offset, values
+            if stored_hash == 0 and free is None:
+                free = offset
+        return (start if free is None else free), None
+
+
+class SharedTable(SharedFile):
+    """
+    Небольшой массив записей с заголовком в общей памяти.
+    Читается и перезаписывается целиком под блокировкой всего файла;
+    пустые записи (с нулевым первым полем) пропускаются.
+    """
+
+    def __init__(self, path, rows, header_format, row_format):
+        self.rows = rows
+        self.header = struct.Struct('=' + header_format)
+        self.row = struct.Struct('=' + row_format)
+        super().__init__(path, self.header.size + rows * self.row.size)
+
+    def update(self, func):
+        """
+        Атомарное обновление таблицы.
+        func получает заголовок и список записей и возвращает
+        новый заголовок, новые записи и результат вызова.
+        """
+        with self.locked() as memory:
+            header = self.header.unpack_from(memory, 0)
+            rows = [
+                row for row in self.row.iter_unpack(
+                    memory[self.header.size:self.size]
+                ) if row[0]
+            ]
+            header, rows, result = func(header, rows)
+            self.header.pack_into(memory, 0, *header)
+            data = b''.join(self.row.pack(*row) for row in rows[:self.rows])
+            memory[self.header.size:self.header.size + len(data)] = data
+            memory[self.header.size + len(data):self.size] = bytes(
+                self.size - self.header.size - len(data)
+            )
+        return result
@@ -0,0 +1,104 @@
+import atexit
+import string
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+
+from recipes.models import ShortLink
+
+ALPHABET = string.digits + string.ascii_letters
+CACHE_PREFIX = 'short-link:'
+
+
+def encode(number):
+    """Перевод положительного числа в строку base62."""
+    code = ''
+    while True:
+        number, rest = divmod(number, len(ALPHABET))
+        code = ALPHABET[rest] + code
+        if not number:
+            return code
+
+
+def get_short_code(recipe):
+    """Код короткой ссылки рецепта, создаётся при первом запросе."""
+    link, _ = ShortLink.objects.get_or_create(
+        recipe=recipe, defaults={'code': encode(recipe.id)}
+    )
+    return link.code
+
+
+def resolve(code):
+    """
+    Поиск id рецепта по коду.
+    Горячие ссылки отдаются из кэша без обращения к БД.
+    """
+    key = CACHE_PREFIX + code
+    recipe_id = cache.get(key)
+    if recipe_id is None:
+        recipe_id = ShortLink.objects.filter(
+            code=code
+        ).values_list('recipe_id', flat=True).first()
+        if recipe_id is None:
+            return None
+        cache.set(key, recipe_id, settings.SHORT_LINK_CACHE_TIMEOUT)
+    hits.record(code)
+    return recipe_id
+
+
+def forget(code):
+    """Удаление кода из кэша после фиксации транзакции с удалением ссылки."""
+    transaction.on_commit(lambda: cache.delete(CACHE_PREFIX + code))
+
+
+class HitCounter:
+    """
+    Счётчик переходов по коротким ссылкам.
+    Переходы копятся в памяти и записываются в БД пачкой
+    из фонового потока, запрос на редирект ничего не пишет.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.pending = Counter()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def record(self, code):
+        """Учёт перехода и запуск фонового потока при необходимости."""
+        with self.lock:
+            self.pending[code] += 1
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name='short-link-hits', daemon=True
+                )
+                self.thread.start()
+
+    def run(self):
+        """Периодический сброс накопленных переходов."""
+        while not self.wakeup.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Запись накопленных переходов одной транзакцией."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+        if not pending:
+            return
+        try:
+            with transaction.atomic():
+                for code, count in pending.items():
+                    ShortLink.objects.filter(code=code).update(
+                        hits=F('hits') + count
+                    )
+        finally:
+            connection.close()
+
+
+hits = HitCounter(settings.SHORT_LINK_HITS_FLUSH_INTERVAL)
+atexit.register(hits.flush)
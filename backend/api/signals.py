@@ -0,0 +1,57 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from api.fragments import invalidate
+from api.shortlinks import forget
+from recipes.models import Ingredient, IngredientRecipe, Recipe, ShortLink
+from users.models import User
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    """Сброс фрагмента при изменении или удалении рецепта."""
+    invalidate([instance.id])
+
+
+@receiver(post_delete, sender=ShortLink)
+def forget_short_link(sender, instance, **kwargs):
+    """Короткая ссылка удалённого рецепта больше не ведёт на него."""
+    forget(instance.code)
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def invalidate_recipe_ingredient(sender, instance, **kwargs):
+    """Сброс фрагмента при изменении состава рецепта."""
+    invalidate([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_recipe_ingredients(sender, instance, action, reverse, pk_set, **kwargs):
+    """Сброс фрагментов при массовом изменении ингредиентов рецепта."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate([instance.id])
+    elif pk_set:
+        invalidate(pk_set)
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_ingredient(sender, instance, created, **kwargs):
+    """Сброс фрагментов рецептов с изменённым ингредиентом."""
+    if not created:
+        invalidate(IngredientRecipe.objects.filter(
+            ingredient=instance
+        ).values_list('recipe_id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, created, update_fields, **kwargs):
+    """Сброс фрагментов рецептов автора при изменении его профиля."""
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    invalidate(Recipe.objects.filter(
+        author=instance
+    ).values_list('id', flat=True))
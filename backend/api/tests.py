@@ -0,0 +1,525 @@
+import argparse
+import json
+import re
+import sys
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.membership import FAVORITES, SHOPPING_CART, memberships
+from api.trending import board
+from recipes.models import (Favorite, Follow, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart)
+from users.models import User
+
+# Масштабы тестовых данных: пользователи, рецептов на автора,
+# ингредиентов на рецепт.
+SCALES = {
+    'small': (4, 3, 3),
+    'large': (40, 10, 8),
+}
+PAGE_SIZES = (6, 30)
+
+# Ограничение частоты не влияет на число запросов, но остановило бы серию.
+NO_THROTTLING = override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}
+})
+
+
+def verbosity():
+    """Уровень -v/--verbosity, с которым запущен manage.py test."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('-v', '--verbosity', type=int, default=1)
+    return parser.parse_known_args(sys.argv)[0].verbosity
+
+
+def print_query_counts(title, columns, rows):
+    """Таблица числа запросов в stderr при -v 2 и выше."""
+    if verbosity() < 2:
+        return
+    table = [('', *columns)] + [
+        (name, *(str(value) for value in values)) for name, values in rows
+    ]
+    widths = [max(len(row[index]) for row in table) for index in range(len(columns) + 1)]
+    lines = [title] + [
+        '  '.join(
+            cell.ljust(width) if index == 0 else cell.rjust(width)
+            for index, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in table
+    ]
+    sys.stderr.write('\n' + '\n'.join(lines) + '\n')
+
+
+class Rollback(Exception):
+    """Откат тестовых данных одного масштаба."""
+
+
+def seed(users_count, recipes_per_user, ingredients_per_recipe):
+    """Тестовые пользователи, рецепты, подписки, избранное и покупки."""
+    User.objects.bulk_create(
+        User(
+            username=f'budget{i}', email=f'budget{i}@example.com',
+            first_name='Тест', last_name='Тестов', password='-'
+        )
+        for i in range(users_count)
+    )
+    users = list(User.objects.filter(username__startswith='budget'))
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'бюджет {i}', measurement_unit='г')
+        for i in range(ingredients_per_recipe * 2)
+    )
+    ingredients = list(
+        Ingredient.objects.filter(name__startswith='бюджет ')
+    )
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=author, name=f'Рецепт {number}', text='Текст',
+            cooking_time=number + 1, image='recipes/budget.png'
+        )
+        for author in users for number in range(recipes_per_user)
+    )
+    recipes = list(Recipe.objects.filter(author__in=users))
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(
+            recipe=recipe,
+            ingredient=ingredients[(index + offset) % len(ingredients)],
+            amount=10
+        )
+        for index, recipe in enumerate(recipes)
+        for offset in range(ingredients_per_recipe)
+    )
+    user = users[0]
+    Follow.objects.bulk_create(
+        Follow(user=user, author=author) for author in users[1:]
+    )
+    for model in (Favorite, ShoppingCart):
+        model.objects.bulk_create(
+            model(author=user, recipe=recipe) for recipe in recipes
+        )
+    return user, recipes, ingredients
+
+
+def clear_caches():
+    """Сброс кэшей процесса и общего топа популярных рецептов."""
+    cache.clear()
+    memberships.entries.clear()
+    board.table.update(lambda header, rows: ((0, 0, 0), [], None))
+
+
+def endpoints(user, recipes, ingredients):
+    """Эндпоинты API: название, клиент, способ вызова и адрес."""
+    recipe, ingredient, author = recipes[-1], ingredients[0], recipes[0].author
+    # Рецепты в пределах наибольшей страницы и один несуществующий id.
+    batch_ids = ','.join(
+        str(item.id) for item in recipes[:PAGE_SIZES[-1]]
+    ) + f',{recipe.id + 10 ** 6}'
+    anonymous, client = APIClient(), APIClient()
+    client.force_authenticate(user)
+    return [
+        ('recipes list (anon)', anonymous, 'get', '/api/recipes/?limit={limit}'),
+        ('recipes list', client, 'get', '/api/recipes/?limit={limit}'),
+        ('recipes favorited', client, 'get', '/api/recipes/?is_favorited=1&limit={limit}'),
+        ('recipes in cart', client, 'get', '/api/recipes/?is_in_shopping_cart=1&limit={limit}'),
+        ('recipes by author', client, 'get', f'/api/recipes/?author={author.id}&limit={{limit}}'),
+        ('recipes by authors', client, 'get', f'/api/recipes/?authors={author.id},{user.id}&limit={{limit}}'),
+        ('recipes by cooking time', client, 'get', '/api/recipes/?cooking_time_min=2&cooking_time_max=5&limit={limit}'),
+        ('recipes with ingredients', client, 'get', f'/api/recipes/?ingredients={ingredient.id},{ingredients[1].id}&limit={{limit}}'),
+        ('recipes without ingredients', client, 'get', f'/api/recipes/?exclude_ingredients={ingredient.id}&limit={{limit}}'),
+        ('recipes subscribed', client, 'get', '/api/recipes/?is_subscribed=1&limit={limit}'),
+        ('recipes batch', client, 'get', f'/api/recipes/batch/?ids={batch_ids}'),
+        ('recipe detail', client, 'get', f'/api/recipes/{recipe.id}/'),
+        ('recipe similar', client, 'get', f'/api/recipes/{recipe.id}/similar/'),
+        ('recipe get-link', client, 'get', f'/api/recipes/{recipe.id}/get-link/'),
+        ('recipes trending', client, 'get', '/api/recipes/trending/?limit={limit}'),
+        ('shopping list', client, 'get', '/api/recipes/download_shopping_cart/'),
+        ('favorite add+remove', client, 'toggle', f'/api/recipes/{recipe.id}/favorite/'),
+        ('cart add+remove', client, 'toggle', f'/api/recipes/{recipe.id}/shopping_cart/'),
+        ('ingredients search', anonymous, 'get', '/api/ingredients/?name=бюджет'),
+        ('ingredient detail', anonymous, 'get', f'/api/ingredients/{ingredient.id}/'),
+        ('ingredients snapshot', anonymous, 'get', '/api/ingredients/snapshot/'),
+        ('users list (anon)', anonymous, 'get', '/api/users/?limit={limit}'),
+        ('users list', client, 'get', '/api/users/?limit={limit}'),
+        ('user detail', client, 'get', f'/api/users/{author.id}/'),
+        ('users me', client, 'get', '/api/users/me/'),
+        ('subscriptions', client, 'get', '/api/users/subscriptions/?limit={limit}&recipes_limit=3'),
+        ('subscribe+unsubscribe', client, 'subscribe', f'/api/users/{author.id}/subscribe/'),
+    ]
+
+
+@NO_THROTTLING
+class QueryBudgetTest(TestCase):
+    """
+    Каждый эндпоинт API выполняет одинаковое число запросов
+    независимо от размера страницы и объёма данных,
+    как с пустыми кэшами, так и с прогретыми.
+    Замеры выводятся таблицей при manage.py test -v 2.
+    """
+    results = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        columns = [(state, scale) for state in ('cold', 'warm') for scale in SCALES]
+        print_query_counts(
+            'Запросов на эндпоинт (значения для limit=6/30):',
+            [f'{state} {scale}' for state, scale in columns],
+            [
+                (name, [
+                    '/'.join(
+                        str(counts[(state, scale, limit)]) for limit in PAGE_SIZES
+                        if (state, scale, limit) in counts
+                    )
+                    for state, scale in columns
+                ])
+                for name, counts in cls.results.items()
+            ]
+        )
+        super().tearDownClass()
+
+    def setUp(self):
+        clear_caches()
+
+    def call(self, api_client, method, path):
+        if method == 'get':
+            response = api_client.get(path)
+        else:
+            api_client.delete(path)
+            response = api_client.post(path)
+            api_client.delete(path)
+            if method == 'subscribe':
+                # Возвращаем подписку, на ней держится список подписок.
+                api_client.post(path)
+        self.assertLess(response.status_code, 400, path)
+
+    def count(self, api_client, method, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.call(api_client, method, path)
+        return len(queries)
+
+    def measure(self, scale, results):
+        for name, api_client, method, url in endpoints(*seed(*SCALES[scale])):
+            # Без пагинации достаточно одного замера: повторный вызов
+            # застал бы записи, созданные первым (короткую ссылку и т.п.).
+            limits = PAGE_SIZES if '{limit}' in url else PAGE_SIZES[:1]
+            for limit in limits:
+                path = url.format(limit=limit)
+                clear_caches()
+                cold = self.count(api_client, method, path)
+                warm = self.count(api_client, method, path)
+                counts = results.setdefault(name, {})
+                counts[('cold', scale, limit)] = cold
+                counts[('warm', scale, limit)] = warm
+
+    def test_query_count_does_not_grow(self):
+        results = self.results
+        for scale in SCALES:
+            try:
+                with transaction.atomic():
+                    self.measure(scale, results)
+                    raise Rollback
+            except Rollback:
+                pass
+        for name, counts in results.items():
+            for state in ('cold', 'warm'):
+                with self.subTest(endpoint=name, caches=state):
+                    measured = {
+                        key: value for key, value in counts.items()
+                        if key[0] == state
+                    }
+                    self.assertEqual(len(set(measured.values())), 1, measured)
+
+
+# Чтение наборов пользователя отдельным запросом, а не подзапросом.
+MEMBERSHIP_READ = re.compile(r'^SELECT .* FROM "recipes_(favorite|shoppingcart|follow)"(?! U\d)')
+
+
+@NO_THROTTLING
+class MembershipCacheTest(TestCase):
+    """
+    Кэш наборов api.membership сокращает запросы типичной сессии.
+    Замеры выводятся таблицей при manage.py test -v 2.
+    """
+    results = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        print_query_counts(
+            'Запросов за сессию из 30 обращений к API:',
+            ['всего', 'чтений наборов'],
+            list(cls.results.items())
+        )
+        super().tearDownClass()
+
+    def setUp(self):
+        clear_caches()
+        self.size = memberships.size
+
+    def tearDown(self):
+        memberships.size = self.size
+        memberships.entries.clear()
+
+    def session(self, client, recipes):
+        """Сценарий: страницы списка, карточки рецептов, переключения."""
+        with CaptureQueriesContext(connection) as queries:
+            for number in range(5):
+                recipe = recipes[number % len(recipes)]
+                client.get('/api/recipes/?limit=6')
+                client.get('/api/recipes/?limit=6&page=2')
+                for other in recipes[number:number + 3]:
+                    client.get(f'/api/recipes/{other.id}/')
+                client.delete(f'/api/recipes/{recipe.id}/favorite/')
+                client.post(f'/api/recipes/{recipe.id}/favorite/')
+        reads = sum(1 for query in queries if MEMBERSHIP_READ.match(query['sql']))
+        return len(queries), reads
+
+    def test_cache_saves_queries(self):
+        user, recipes, _ = seed(*SCALES['large'])
+        client = APIClient()
+        client.force_authenticate(user)
+        counts = self.results
+        for name, size in (('без LRU', 0), ('с LRU', self.size)):
+            memberships.size = size
+            memberships.entries.clear()
+            counts[name] = self.session(client, recipes)
+        self.assertLess(counts['с LRU'][0], counts['без LRU'][0], counts)
+        # Наборы читаются один раз, дальше их патчат переключения.
+        self.assertEqual(counts['с LRU'][1], 1, counts)
+
+
+@NO_THROTTLING
+class BulkMembershipTest(TestCase):
+    """Массовое добавление и удаление рецептов в избранном и покупках."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.recipes, _ = seed(*SCALES['small'])
+        Favorite.objects.filter(author=cls.user).delete()
+        ShoppingCart.objects.filter(author=cls.user).delete()
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.unknown = max(recipe.id for recipe in self.recipes) + 10 ** 6
+
+    def bulk(self, method, path, ids):
+        response = getattr(self.client, method)(
+            f'/api/recipes/{path}/', {'ids': ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(result['id'], result['status']) for result in response.data['results']]
+
+    def assert_cache_matches(self, model, kind):
+        """Набор в кэше совпадает с БД после массовой операции."""
+        stored = sorted(
+            model.objects.filter(author=self.user).values_list('recipe_id', flat=True)
+        )
+        self.assertEqual(list(getattr(memberships.get(self.user.id), kind)), stored)
+
+    def test_duplicates(self):
+        first, second = self.recipes[0].id, self.recipes[1].id
+        results = self.bulk('post', 'bulk_favorite', [first, second, first, second])
+        self.assertEqual(results, [(first, 'added'), (second, 'added')])
+        self.assertEqual(Favorite.objects.filter(author=self.user).count(), 2)
+        results = self.bulk('delete', 'bulk_favorite', [second, second])
+        self.assertEqual(results, [(second, 'removed')])
+
+    def test_unknown_ids(self):
+        recipe = self.recipes[0].id
+        results = self.bulk('post', 'bulk_shopping_cart', [self.unknown, recipe])
+        self.assertEqual(results, [(self.unknown, 'not_found'), (recipe, 'added')])
+        results = self.bulk('delete', 'bulk_shopping_cart', [self.unknown, recipe])
+        self.assertEqual(results, [(self.unknown, 'not_found'), (recipe, 'removed')])
+        self.assertFalse(ShoppingCart.objects.filter(author=self.user).exists())
+
+    def test_mixed_add_and_remove(self):
+        ids = [recipe.id for recipe in self.recipes[:4]]
+        self.bulk('post', 'bulk_favorite', ids[:2])
+        results = self.bulk('post', 'bulk_favorite', ids[1:3])
+        self.assertEqual(results, [(ids[1], 'exists'), (ids[2], 'added')])
+        results = self.bulk('delete', 'bulk_favorite', [ids[0], ids[3]])
+        self.assertEqual(results, [(ids[0], 'removed'), (ids[3], 'not_found')])
+        self.assertEqual(
+            set(Favorite.objects.filter(author=self.user).values_list('recipe_id', flat=True)),
+            {ids[1], ids[2]}
+        )
+
+    def test_cache_stays_consistent(self):
+        ids = [recipe.id for recipe in self.recipes[:5]]
+        for model, kind, path in (
+            (Favorite, FAVORITES, 'bulk_favorite'),
+            (ShoppingCart, SHOPPING_CART, 'bulk_shopping_cart'),
+        ):
+            with self.subTest(path=path):
+                # Прогретая копия должна патчиться, а не расходиться с БД.
+                memberships.get(self.user.id)
+                self.bulk('post', path, ids[:3] + [self.unknown])
+                self.assert_cache_matches(model, kind)
+                self.bulk('post', path, ids[2:])
+                self.assert_cache_matches(model, kind)
+                self.bulk('delete', path, ids[1:4] + [self.unknown])
+                self.assert_cache_matches(model, kind)
+                for recipe_id in ids:
+                    self.assertEqual(
+                        memberships.get(self.user.id).has(kind, recipe_id),
+                        recipe_id in (ids[0], ids[4])
+                    )
+
+
+@NO_THROTTLING
+class ShortLinkTest(TestCase):
+    """Короткие ссылки открываются одним редиректом и гаснут с рецептом."""
+
+    def setUp(self):
+        clear_caches()
+        user, recipes, _ = seed(*SCALES['small'])
+        self.recipe = recipes[0]
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_redirect_without_append_slash(self):
+        link = self.client.get(f'/api/recipes/{self.recipe.id}/get-link/').data['short-link']
+        path = link.split('testserver', 1)[1]
+        self.assertFalse(path.endswith('/'), path)
+        for url in (path, path + '/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 302)
+                self.assertEqual(response['Location'], f'/recipes/{self.recipe.id}')
+
+    def test_deleted_recipe(self):
+        link = self.client.get(f'/api/recipes/{self.recipe.id}/get-link/').data['short-link']
+        path = link.split('testserver', 1)[1]
+        # Код попадает в кэш при первом переходе.
+        self.assertEqual(self.client.get(path).status_code, 302)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertEqual(self.client.get(path).status_code, 404)
+
+
+def plan_nodes(plan):
+    """Все узлы плана EXPLAIN (FORMAT JSON)."""
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+@NO_THROTTLING
+@skipUnless(connection.vendor == 'postgresql', 'Планы проверяются только на PostgreSQL.')
+class RecipeFilterPlanTest(TestCase):
+    """
+    Фильтры списка рецептов на большом наборе данных читают рецепты
+    и состав по индексам, без последовательного чтения таблиц.
+    Проверяются планы тех запросов, которые выполняет сам список:
+    id страницы и COUNT(*) для пагинации.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(
+                username=f'plan{i}', email=f'plan{i}@example.com',
+                first_name='Тест', last_name='Тестов', password='-'
+            )
+            for i in range(200)
+        )
+        cls.authors = list(User.objects.filter(username__startswith='plan'))
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'план {i}', measurement_unit='г')
+            for i in range(500)
+        )
+        cls.ingredients = list(Ingredient.objects.filter(name__startswith='план '))
+        Recipe.objects.bulk_create((
+            Recipe(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=(number * 7 + index) % 600 + 1,
+                image='recipes/plan.png'
+            )
+            for index, author in enumerate(cls.authors)
+            for number in range(100)
+        ), batch_size=5000)
+        recipe_ids = Recipe.objects.values_list('id', flat=True)
+        IngredientRecipe.objects.bulk_create((
+            IngredientRecipe(
+                recipe_id=recipe_id,
+                ingredient=cls.ingredients[(recipe_id * 3 + offset) % 500],
+                amount=10
+            )
+            for recipe_id in recipe_ids for offset in range(3)
+        ), batch_size=5000)
+        Follow.objects.bulk_create(
+            Follow(user=cls.authors[0], author=author)
+            for author in cls.authors[1:4]
+        )
+        with connection.cursor() as cursor:
+            for model in (Recipe, IngredientRecipe, Follow):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def setUp(self):
+        clear_caches()
+
+    def plans(self, path, user=None):
+        """Планы запросов страницы id и COUNT(*), выполненных списком."""
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        plans = {}
+        for query in queries:
+            sql = query['sql']
+            if sql.startswith('SELECT COUNT(*)'):
+                kind = 'count'
+            elif sql.startswith('SELECT "recipes_recipe"."id" FROM'):
+                kind = 'page'
+            else:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            plans[kind] = list(plan_nodes(plan[0]['Plan']))
+        self.assertEqual(set(plans), {'page', 'count'}, path)
+        return plans
+
+    def assert_no_seq_scan(self, plans, *models):
+        tables = {model._meta.db_table for model in models}
+        for kind, nodes in plans.items():
+            scanned = {
+                node.get('Relation Name') for node in nodes
+                if node['Node Type'] == 'Seq Scan'
+            }
+            self.assertFalse(scanned & tables, f'{kind}: {nodes}')
+
+    def assert_uses_index(self, plans, index):
+        for kind, nodes in plans.items():
+            self.assertIn(
+                index, {node.get('Index Name') for node in nodes},
+                f'{kind}: {nodes}'
+            )
+
+    def test_cooking_time(self):
+        plans = self.plans('/api/recipes/?cooking_time_min=10&cooking_time_max=11&limit=10')
+        self.assert_uses_index(plans, 'recipe_cooking_time_idx')
+        self.assert_no_seq_scan(plans, Recipe)
+
+    def test_authors(self):
+        authors = ','.join(str(author.id) for author in self.authors[:3])
+        plans = self.plans(f'/api/recipes/?authors={authors}&limit=10')
+        self.assert_no_seq_scan(plans, Recipe)
+
+    def test_subscribed(self):
+        plans = self.plans('/api/recipes/?is_subscribed=1&limit=10', self.authors[0])
+        self.assert_no_seq_scan(plans, Recipe, Follow)
+
+    def test_ingredients(self):
+        ingredients = f'{self.ingredients[0].id},{self.ingredients[1].id}'
+        plans = self.plans(f'/api/recipes/?ingredients={ingredients}&limit=10')
+        self.assert_no_seq_scan(plans, IngredientRecipe)
@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from api.shared_memory import SharedSlots
+
+buckets = SharedSlots(
+    settings.THROTTLE_BUCKETS_PATH,
+    settings.THROTTLE_BUCKETS_SLOTS,
+    value_format='dd'
+)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Ограничение частоты запросов по алгоритму token bucket.
+    Корзины лежат в общей памяти, поэтому лимит общий для всех
+    воркеров на хосте, а проверка стоит O(1) без внешних сервисов.
+    Область задаётся для действия вьюсета в атрибуте throttle_scopes,
+    лимит — в DEFAULT_THROTTLE_RATES под ключом '<область>_<kind>'.
+    """
+    kind = None
+
+    def get_ident_key(self, request):
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def parse_rate(self, rate):
+        """Разбор лимита вида '60/min': ёмкость и скорость пополнения."""
+        num, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(num), int(num) / duration
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scopes', {}).get(view.action)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f'{scope}_{self.kind}')
+        if rate is None:
+            return True
+        capacity, refill = self.parse_rate(rate)
+        self.refill = refill
+
+        def take(values):
+            now = time.time()
+            tokens, stamp = values or (capacity, now)
+            tokens = min(capacity, tokens + (now - stamp) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            return (tokens, now), (allowed, tokens)
+
+        key = f'{scope}_{self.kind}:{self.get_ident_key(request)}'
+        allowed, self.tokens = buckets.update(key, take)
+        return allowed
+
+    def wait(self):
+        return (1 - self.tokens) / self.refill
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Лимит на пользователя, для анонимов — на IP-адрес."""
+    kind = 'user'
+
+    def get_ident_key(self, request):
+        if request.user.is_authenticated:
+            return f'user-{request.user.pk}'
+        return f'ip-{self.get_ident(request)}'
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Лимит на IP-адрес независимо от пользователя.
+    Адрес берётся из X-Forwarded-For с учётом NUM_PROXIES: последний
+    адрес в заголовке дописывает nginx. Это верно, пока nginx —
+    единственный вход в backend (порт 8000 наружу не публикуется).
+    """
+    kind = 'ip'
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
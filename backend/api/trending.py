@@ -0,0 +1,127 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+from api.shared_memory import SharedTable
+from recipes.models import Favorite, ShoppingCart
+
+# Вес события для рейтинга: избранное ценится выше покупки.
+EVENT_WEIGHTS = {
+    Favorite: 1.0,
+    ShoppingCart: 0.5,
+}
+
+
+class TrendingBoard:
+    """
+    Рейтинг популярных рецептов с экспоненциальным затуханием.
+    Ограниченный топ хранится в файле в общей памяти, поэтому у всех
+    воркеров одинаковый порядок и страницы не повторяются и не теряются.
+    Новые события учитываются сразу, полный пересчёт по таблицам
+    выполняет фоновым потоком тот воркер, который первым заметил,
+    что топ устарел. Очки хранятся относительно опорного времени,
+    поэтому прибавка нового события не требует пересчёта остальных.
+    """
+
+    def __init__(self, path, size, half_life, window, refresh_interval):
+        self.size = size
+        self.half_life = half_life
+        self.window = window
+        self.refresh_interval = refresh_interval
+        # Заголовок: опорное время, время пересчёта и время,
+        # когда пересчёт взял на себя один из воркеров.
+        self.table = SharedTable(path, 2 * size, 'ddd', 'Qd')
+
+    def record(self, model, recipe_id):
+        """Учёт нового события без обращения к БД."""
+        now = time.time()
+
+        def add(header, rows):
+            reference, refreshed, claimed = header
+            if not reference:
+                reference = now
+            weight = EVENT_WEIGHTS[model] * 2 ** (
+                (now - reference) / self.half_life
+            )
+            scores = dict(rows)
+            scores[recipe_id] = scores.get(recipe_id, 0) + weight
+            rows = self.largest(scores, 2 * self.size)
+            return (reference, refreshed, claimed), rows, None
+
+        self.table.update(add)
+
+    def recipe_ids(self):
+        """Id рецептов в порядке убывания популярности."""
+        now = time.time()
+
+        def read(header, rows):
+            reference, refreshed, claimed = header
+            stale = now - refreshed > self.refresh_interval
+            # Пересчёт берёт на себя один воркер; если он не справился
+            # за период пересчёта, отметка протухает и берёт другой.
+            claim = stale and now - claimed > self.refresh_interval
+            if claim:
+                claimed = now
+            top = [pk for pk, _ in self.largest(dict(rows), self.size)]
+            return (reference, refreshed, claimed), rows, (refreshed, claim, top)
+
+        refreshed, claim, top = self.table.update(read)
+        if not refreshed:
+            self.refresh()
+            return self.recipe_ids()
+        if claim:
+            threading.Thread(
+                target=self.refresh_in_background,
+                name='trending-refresh',
+                daemon=True
+            ).start()
+        return top
+
+    def largest(self, scores, size):
+        return heapq.nlargest(size, scores.items(), key=lambda item: item[1])
+
+    def refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            connection.close()
+
+    def refresh(self):
+        """
+        Пересчёт очков по событиям за окно рейтинга.
+        События группируются по часам, так что объём выборки
+        не зависит от числа добавлений.
+        """
+        now = time.time()
+        since = datetime.fromtimestamp(now) - timedelta(seconds=self.window)
+        scores = {}
+        for model, weight in EVENT_WEIGHTS.items():
+            rows = model.objects.filter(
+                added_at__gte=since
+            ).annotate(
+                hour=TruncHour('added_at')
+            ).values('recipe_id', 'hour').annotate(
+                events=Count('id')
+            ).values_list('recipe_id', 'hour', 'events')
+            for recipe_id, hour, events in rows:
+                age = now - hour.timestamp()
+                scores[recipe_id] = scores.get(recipe_id, 0) + (
+                    weight * events * 0.5 ** (age / self.half_life)
+                )
+        rows = self.largest(scores, 2 * self.size)
+        self.table.update(lambda header, _: ((now, now, 0), rows, None))
+
+
+board = TrendingBoard(
+    path=settings.TRENDING_BOARD_PATH,
+    size=settings.TRENDING_SIZE,
+    half_life=settings.TRENDING_HALF_LIFE,
+    window=settings.TRENDING_WINDOW,
+    refresh_interval=settings.TRENDING_REFRESH_INTERVAL
+)
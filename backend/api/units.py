@@ -0,0 +1,93 @@
+from decimal import ROUND_CEILING, Decimal
+
+from django.db.models import Case, CharField, F, IntegerField, Sum, Value, When
+
+# Единица измерения -> (каноническая единица, множитель).
+UNIT_CONVERSIONS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+}
+
+# Каноническая единица -> (крупная единица для вывода, делитель).
+DISPLAY_UNITS = {
+    'г': ('кг', 1000),
+    'мл': ('л', 1000),
+}
+
+
+def aggregate_ingredients(queryset):
+    """
+    Суммирование ингредиентов с приведением к каноническим единицам.
+    Пересчёт и группировка выполняются одним SQL-запросом,
+    результат можно использовать для любого формата выгрузки.
+    """
+    unit = 'ingredient__measurement_unit'
+    return queryset.annotate(
+        unit=Case(
+            *(When(**{unit: source}, then=Value(target))
+              for source, (target, _) in UNIT_CONVERSIONS.items()),
+            default=F(unit),
+            output_field=CharField()
+        ),
+        factor=Case(
+            *(When(**{unit: source}, then=Value(factor))
+              for source, (_, factor) in UNIT_CONVERSIONS.items()),
+            default=Value(1),
+            output_field=IntegerField()
+        )
+    ).values(
+        'ingredient__name', 'unit'
+    ).annotate(
+        total_amount=Sum(F('amount') * F('factor'))
+    ).order_by('ingredient__name', 'unit')
+
+
+def exact(amount, unit):
+    """Без округления."""
+    return Decimal(amount), unit
+
+
+def human(amount, unit):
+    """Перевод в крупные единицы (кг, л) с двумя знаками после запятой."""
+    amount = Decimal(amount)
+    if unit in DISPLAY_UNITS:
+        display_unit, divisor = DISPLAY_UNITS[unit]
+        if amount >= divisor:
+            return (amount / divisor).quantize(Decimal('0.01')), display_unit
+    return amount, unit
+
+
+def round_up(amount, unit):
+    """Крупные единицы с округлением вверх до десятых, чтобы точно хватило."""
+    amount = Decimal(amount)
+    if unit in DISPLAY_UNITS:
+        display_unit, divisor = DISPLAY_UNITS[unit]
+        if amount >= divisor:
+            return (
+                (amount / divisor).quantize(Decimal('0.1'), ROUND_CEILING),
+                display_unit
+            )
+    return amount.to_integral_value(ROUND_CEILING), unit
+
+
+ROUNDING_STRATEGIES = {
+    'exact': exact,
+    'up': round_up,
+    'human': human,
+}
+
+
+def format_amount(amount):
+    """Число без лишних нулей после запятой."""
+    text = format(amount, 'f')
+    return text.rstrip('0').rstrip('.') if '.' in text else text
+
+
+def shopping_list_rows(queryset, rounding='exact'):
+    """Строки списка покупок: название, количество и единица измерения."""
+    strategy = ROUNDING_STRATEGIES.get(rounding, exact)
+    for row in aggregate_ingredients(queryset):
+        amount, unit = strategy(row['total_amount'], row['unit'])
+        yield row['ingredient__name'], format_amount(amount), unit
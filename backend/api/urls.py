@@ -1,7 +1,7 @@
 from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 from django.views.generic import TemplateView
-from .views import RecipeViewSet, IngredientViewSet
+from .views import RecipeViewSet, IngredientViewSet, health
 from users.views import UserViewSet
 
 
@@ -11,6 +11,7 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 router.register('ingredients', IngredientViewSet)
 
 urlpatterns = [
+    path('health/', health, name='health'),
     path('', include(router.urls)),
     re_path(r'auth/', include('djoser.urls.authtoken')),
 ]
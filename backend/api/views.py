@@ -1,24 +1,49 @@
+import gzip
+
 from rest_framework import viewsets, status, mixins
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.permissions import SAFE_METHODS
 from django_filters.rest_framework import DjangoFilterBackend
-from django.shortcuts import get_object_or_404
+from django.db import connection
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 
-from recipes.models import Recipe, Ingredient, Favorite, ShoppingCart, User
+from django.db.models import Prefetch
+
+from recipes.models import (
+    Recipe, Ingredient, IngredientRecipe, Favorite, ShoppingCart, User, RecipeSimilarity
+)
+from recipes.catalog import current_version, delta, snapshot
+from recipes.similarity import TOP_K
 from api.serializers import (
     RecipeListSerializer,
     IngredientSerializer,
     FavoriteSerializer,
     ShoppingCartSerializer,
-    RecipeWriteSerializer
+    RecipeWriteSerializer,
+    RecipeIdsSerializer,
+    SimilarRecipeSerializer
+)
+from api.fragments import render_recipes
+from api.membership import MODEL_KINDS, memberships
+from api.services import (
+    ADDED,
+    REMOVED,
+    bulk_add_recipes,
+    bulk_remove_recipes,
+    create_if_absent,
+    download_shopping_cart
 )
-from api.services import download_shopping_cart
+from api.shortlinks import get_short_code, resolve
+from api.trending import board
 from api.permissions import IsOwnerOrAdminOrReadOnly
 from api.filters import IngredientSearchFilter, RecipeFilter
 from api.paginations import ApiPagination
+from api.throttling import IPTokenBucketThrottle, UserTokenBucketThrottle
 
 
 class IngredientViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
@@ -27,7 +52,32 @@ class IngredientViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewse
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     filter_backends = (IngredientSearchFilter,)
-    search_fields = ('^name',)
+
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        """
+        Весь справочник ингредиентов одним сжатым блоком с версией.
+        С параметром since отдаются только изменения после этой версии.
+        """
+        version = current_version()
+        etag = f'"catalog-{version}"'
+        # Слабое сравнение: после CompressionMiddleware клиент получает W/"...".
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        since = request.query_params.get('since')
+        if since is not None and since.isdigit():
+            response = Response(delta(int(since), version))
+        else:
+            blob = snapshot(version)
+            if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+                response = HttpResponse(blob, content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(gzip.decompress(blob), content_type='application/json')
+            patch_vary_headers(response, ('Accept-Encoding',))
+        response['ETag'] = etag
+        return response
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -37,6 +87,34 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     pagination_class = ApiPagination
     filterset_class = RecipeFilter
+    throttle_classes = (UserTokenBucketThrottle, IPTokenBucketThrottle)
+    throttle_scopes = {
+        'list': 'recipes',
+        'batch': 'recipes',
+        'download_shopping_cart': 'shopping_cart',
+    }
+
+    def get_queryset(self):
+        """
+        Рецепты с автором и ингредиентами, загруженными заранее.
+        Признаки избранного, покупок и подписки берутся из api.membership.
+        """
+        queryset = Recipe.objects.select_related('author').prefetch_related(
+            Prefetch(
+                'recipe_ingredients',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            )
+        )
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список рецептов из кэша фрагментов: из БД берутся только id
+        страницы и признаки текущего пользователя.
+        """
+        queryset = self.filter_queryset(Recipe.objects.all())
+        page = self.paginate_queryset(queryset.values_list('id', flat=True))
+        return self.get_paginated_response(render_recipes(request, page))
 
     def get_serializer_class(self):
         """Выбор сериализатора в зависимости от метода запроса."""
@@ -44,51 +122,81 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeListSerializer
         return RecipeWriteSerializer
 
-    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
-    def favorite(self, request, *args, **kwargs):
-        """Добавить или удалить рецепт из избранного."""
-        recipe = get_object_or_404(Recipe, id=self.kwargs.get('pk'))
-        user = self.request.user
-
+    def toggle(self, request, model, serializer_class, message):
+        """
+        Добавление рецепта одним INSERT ... ON CONFLICT DO NOTHING
+        или удаление одним DELETE с проверкой количества удалённых строк.
+        Решение принимает БД, кэш наборов только обновляется по итогу:
+        записи из админки и каскадные удаления в нём не видны.
+        """
+        user = request.user
+        kind = MODEL_KINDS[model]
         if request.method == 'POST':
-            if Favorite.objects.filter(author=user, recipe=recipe).exists():
+            recipe = get_object_or_404(Recipe, id=self.kwargs.get('pk'))
+            obj = create_if_absent(model, author=user, recipe=recipe)
+            # Строка есть в БД в обоих случаях, даже если кэш думал иначе.
+            memberships.changed(user.id, kind, [recipe.id], added=True)
+            if obj is None:
                 return Response({'errors': 'Рецепт уже добавлен!'}, status=status.HTTP_400_BAD_REQUEST)
+            board.record(model, recipe.id)
+            serializer = serializer_class(obj)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-            serializer = FavoriteSerializer(data=request.data)
-            if serializer.is_valid(raise_exception=True):
-                serializer.save(author=user, recipe=recipe)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-        if not Favorite.objects.filter(author=user, recipe=recipe).exists():
+        pk = self.kwargs.get('pk')
+        deleted = 0
+        if pk.isdigit():
+            deleted, _ = model.objects.filter(author=user, recipe_id=pk).delete()
+            memberships.changed(user.id, kind, [int(pk)], added=False)
+        if not deleted:
             return Response({'errors': 'Объект не найден'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(message, status=status.HTTP_204_NO_CONTENT)
 
-        Favorite.objects.get(recipe=recipe).delete()
-        return Response('Рецепт успешно удалён из избранного.', status=status.HTTP_204_NO_CONTENT)
+    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def favorite(self, request, *args, **kwargs):
+        """Добавить или удалить рецепт из избранного."""
+        return self.toggle(
+            request, Favorite, FavoriteSerializer,
+            'Рецепт успешно удалён из избранного.'
+        )
 
     @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, **kwargs):
         """Добавить или удалить рецепт из списка покупок."""
-        recipe = get_object_or_404(Recipe, id=self.kwargs.get('pk'))
-        user = self.request.user
+        return self.toggle(
+            request, ShoppingCart, ShoppingCartSerializer,
+            'Рецепт успешно удалён из списка покупок.'
+        )
 
+    def bulk_change(self, request, model):
+        """Массовое добавление или удаление рецептов по списку id."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['ids']
         if request.method == 'POST':
-            if ShoppingCart.objects.filter(author=user, recipe=recipe).exists():
-                return Response({'errors': 'Рецепт уже добавлен!'}, status=status.HTTP_400_BAD_REQUEST)
+            results = bulk_add_recipes(model, request.user, recipe_ids)
+            for result in results:
+                if result['status'] == ADDED:
+                    board.record(model, result['id'])
+            changed, added = ADDED, True
+        else:
+            results = bulk_remove_recipes(model, request.user, recipe_ids)
+            changed, added = REMOVED, False
+        memberships.changed(
+            request.user.id, MODEL_KINDS[model],
+            [result['id'] for result in results if result['status'] == changed],
+            added=added
+        )
+        return Response({'results': results}, status=status.HTTP_200_OK)
 
-            serializer = ShoppingCartSerializer(data=request.data)
-            if serializer.is_valid(raise_exception=True):
-                serializer.save(author=user, recipe=recipe)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
+    @action(detail=False, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def bulk_favorite(self, request):
+        """Добавить или удалить несколько рецептов из избранного."""
+        return self.bulk_change(request, Favorite)
 
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-        if not ShoppingCart.objects.filter(author=user, recipe=recipe).exists():
-            return Response({'errors': 'Объект не найден'}, status=status.HTTP_404_NOT_FOUND)
-
-        ShoppingCart.objects.get(recipe=recipe).delete()
-        return Response('Рецепт успешно удалён из списка покупок.', status=status.HTTP_204_NO_CONTENT)
+    @action(detail=False, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def bulk_shopping_cart(self, request):
+        """Добавить или удалить несколько рецептов из списка покупок."""
+        return self.bulk_change(request, ShoppingCart)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request):
@@ -98,9 +206,65 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return download_shopping_cart(request, author)
         return Response('Список покупок пуст.', status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Популярные рецепты по недавним добавлениям в избранное и покупки."""
+        page = self.paginate_queryset(board.recipe_ids())
+        return self.get_paginated_response(render_recipes(request, page))
+
+    @action(detail=False, methods=['get', 'post'], permission_classes=[AllowAny])
+    def batch(self, request):
+        """
+        Рецепты по списку id одним ответом: ?ids=1,2,3 или POST
+        с {"ids": [...]} для длинных списков. Порядок сохраняется,
+        отсутствующие id возвращаются в missing.
+        """
+        if request.method == 'GET':
+            data = {'ids': [
+                value for value in request.query_params.get('ids', '').split(',')
+                if value.strip()
+            ]}
+        else:
+            data = request.data
+        serializer = RecipeIdsSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['ids']
+        recipes = render_recipes(request, recipe_ids)
+        found = {recipe['id'] for recipe in recipes}
+        return Response({
+            'results': recipes,
+            'missing': [recipe_id for recipe_id in recipe_ids if recipe_id not in found]
+        })
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Похожие рецепты по пересечению ингредиентов."""
+        recipe = get_object_or_404(Recipe, id=pk)
+        similarities = RecipeSimilarity.objects.filter(
+            recipe=recipe
+        ).select_related('similar').order_by('-score')[:TOP_K]
+        serializer = SimilarRecipeSerializer(similarities, many=True, context={'request': request})
+        return Response(serializer.data)
+
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_recipe_link(self, request, pk=None):
-        """Генерирует полную ссылку на рецепт."""
+        """Генерирует короткую ссылку на рецепт."""
         recipe = self.get_object()
-        absolute_url = request.build_absolute_uri(reverse('recipes-detail', kwargs={'pk': recipe.id}))
+        code = get_short_code(recipe)
+        absolute_url = request.build_absolute_uri(reverse('short-link', kwargs={'code': code}))
         return Response({'short-link': absolute_url})
+
+
+def short_link_redirect(request, code):
+    """Перенаправление с короткой ссылки на страницу рецепта."""
+    recipe_id = resolve(code)
+    if recipe_id is None:
+        raise Http404('Ссылка не найдена')
+    return redirect(f'/recipes/{recipe_id}')
+
+
+def health(request):
+    """Проверка готовности: приложение запущено и БД отвечает."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return JsonResponse({'status': 'ok'})
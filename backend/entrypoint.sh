@@ -1,17 +1,8 @@
 #!/bin/sh
+set -e
 
+export FOODGRAM_BOOT_TS="$(date +%s.%N)"
 
-echo "Waiting for PostgreSQL"
+python manage.py startup
 
-while ! nc -z db 5432; do
-  sleep 1
-done
-
-echo "PostgreSQL started"
-
-python manage.py makemigrations --noinput
-python manage.py migrate --noinput
-
-python manage.py collectstatic --noinput
-
-exec gunicorn foodgram.wsgi:application --bind 0.0.0.0:8000
+exec gunicorn --config gunicorn.conf.py foodgram.wsgi:application
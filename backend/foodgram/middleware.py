@@ -0,0 +1,306 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import traceback
+import zlib
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connection
+from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+
+from api.shared_memory import SharedSlots
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger('foodgram.compression')
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript',
+    'application/xml', 'image/svg+xml',
+)
+
+
+def gzip_compressor(level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def brotli_compressor(level):
+    compressor = brotli.Compressor(quality=level)
+    return compressor.process, compressor.finish
+
+
+def zstd_compressor(level):
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return compressor.compress, compressor.flush
+
+
+# Кодировки в порядке предпочтения сервера.
+COMPRESSORS = [
+    (name, factory) for name, factory, available in (
+        ('br', brotli_compressor, brotli is not None),
+        ('zstd', zstd_compressor, zstandard is not None),
+        ('gzip', gzip_compressor, True),
+    ) if available
+]
+
+
+class CompressionMetrics:
+    """
+    Счётчики сжатия по кодировкам: ответы, байты до/после и время CPU.
+    Лежат в файле в общей памяти, так что суммы общие для всех воркеров.
+    """
+    FIELDS = ('responses', 'bytes_in', 'bytes_out', 'cpu_seconds')
+
+    def __init__(self, path):
+        self.slots = SharedSlots(path, 64, 'd' * len(self.FIELDS))
+
+    def record(self, encoding, content_type, size, compressed, cpu):
+        def add(values):
+            values = [
+                total + value for total, value in zip(
+                    values or [0] * len(self.FIELDS), (1, size, compressed, cpu)
+                )
+            ]
+            return values, None
+
+        self.slots.update(encoding, add)
+        logger.debug(
+            '%s %s: %d -> %d байт, %.2f мс CPU',
+            encoding, content_type, size, compressed, cpu * 1000
+        )
+
+    def snapshot(self):
+        totals = {}
+        for encoding, _ in COMPRESSORS:
+            values = self.slots.update(encoding, lambda values: (
+                values or [0] * len(self.FIELDS), values
+            ))
+            if values:
+                totals[encoding] = dict(zip(self.FIELDS, values))
+        return totals
+
+
+metrics = CompressionMetrics(settings.COMPRESSION_METRICS_PATH)
+
+
+@staff_member_required
+def compression_view(request):
+    """Страница админки со сводкой сжатия ответов по кодировкам."""
+    rows = []
+    for encoding, totals in metrics.snapshot().items():
+        rows.append(dict(
+            totals,
+            encoding=encoding,
+            saved=totals['bytes_in'] - totals['bytes_out'],
+            ratio=totals['bytes_out'] / totals['bytes_in'] if totals['bytes_in'] else 1,
+            cpu_ms=totals['cpu_seconds'] * 1000 / totals['responses'],
+        ))
+    return render(request, 'admin/compression.html', {
+        'title': 'Сжатие ответов',
+        'rows': rows,
+        'available': [encoding for encoding, _ in COMPRESSORS],
+    })
+
+
+def parse_accept_encoding(header):
+    """Кодировки из Accept-Encoding, разрешённые клиентом (q > 0)."""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов brotli, zstd или gzip по заголовку Accept-Encoding.
+    Маленькие, уже сжатые и несжимаемые ответы пропускаются,
+    уровень сжатия настраивается для типа содержимого
+    в COMPRESSION_LEVELS, потоковые ответы сжимаются на лету.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.should_compress(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = parse_accept_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        for encoding, factory in COMPRESSORS:
+            if encoding in accepted:
+                break
+        else:
+            return response
+
+        content_type = response.get('Content-Type', '').split(';')[0]
+        levels = settings.COMPRESSION_LEVELS.get(
+            content_type, settings.COMPRESSION_LEVELS['default']
+        )
+        compress, flush = factory(levels[encoding])
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                response.streaming_content, compress, flush,
+                encoding, content_type
+            )
+            del response['Content-Length']
+        else:
+            started = time.thread_time()
+            content = compress(response.content) + flush()
+            metrics.record(
+                encoding, content_type, len(response.content),
+                len(content), time.thread_time() - started
+            )
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def should_compress(self, response):
+        """Пропуск маленьких, уже сжатых и несжимаемых ответов."""
+        if response.status_code != 200 or response.has_header(
+            'Content-Encoding'
+        ):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        if not response.get('Content-Type', '').startswith(
+            COMPRESSIBLE_TYPES
+        ):
+            return False
+        return response.streaming or (
+            len(response.content) >= settings.COMPRESSION_MIN_SIZE
+        )
+
+    def compress_stream(self, chunks, compress, flush, encoding, content_type):
+        """Потоковое сжатие с учётом метрик по окончании ответа."""
+        size = compressed = 0
+        cpu = 0.0
+        for chunk in chunks:
+            started = time.thread_time()
+            data = compress(chunk)
+            cpu += time.thread_time() - started
+            size += len(chunk)
+            compressed += len(data)
+            if data:
+                yield data
+        started = time.thread_time()
+        data = flush()
+        cpu += time.thread_time() - started
+        compressed += len(data)
+        metrics.record(encoding, content_type, size, compressed, cpu)
+        yield data
+
+
+def redact(params):
+    """
+    Параметры запроса без строк и байтов: в них бывают токены, email
+    и хеши паролей. Числа, даты и NULL остаются для EXPLAIN ANALYZE.
+    """
+    if params is None:
+        return None, False
+    if isinstance(params, dict):
+        params = list(params.values())
+    secret = [isinstance(value, (str, bytes, memoryview)) for value in params]
+    return [
+        None if hidden else value for value, hidden in zip(params, secret)
+    ], any(secret)
+
+
+class SlowQueryLogger:
+    """
+    Обёртка выполнения SQL: запросы дольше порога записываются
+    в журнал JSON Lines вместе с view и строкой кода, откуда пришёл запрос.
+    Строковые параметры не сохраняются, журнал ограничен по размеру.
+    """
+    lock = threading.Lock()
+
+    def __init__(self, request):
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            if (duration >= settings.SLOW_QUERY_THRESHOLD_MS
+                    and random.random() < settings.SLOW_QUERY_SAMPLE_RATE):
+                self.record(sql, params, many, duration)
+
+    def record(self, sql, params, many, duration):
+        match = self.request.resolver_match
+        params, redacted = redact(None if many else params)
+        line = json.dumps({
+            'time': time.time(),
+            'duration_ms': round(duration, 2),
+            'sql': sql,
+            'params': params,
+            'redacted': redacted,
+            'view': match.view_name if match else self.request.path,
+            'frame': self.origin(),
+        }, ensure_ascii=False, default=str)
+        path = settings.SLOW_QUERY_LOG
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.lock:
+            try:
+                if os.path.getsize(path) >= settings.SLOW_QUERY_LOG_MAX_BYTES:
+                    os.replace(path, path + '.1')
+            except FileNotFoundError:
+                pass
+            with open(path, 'a') as log:
+                log.write(line + '\n')
+
+    @staticmethod
+    def origin():
+        """Ближайшая к запросу строка кода проекта."""
+        for frame in reversed(traceback.extract_stack()):
+            if (frame.filename.startswith(settings.BASE_DIR)
+                    and frame.filename != __file__
+                    and 'site-packages' not in frame.filename):
+                return f'{frame.filename}:{frame.lineno} in {frame.name}'
+        return None
+
+
+class SlowQueryMiddleware:
+    """Сбор медленных SQL-запросов, порог задаётся SLOW_QUERY_THRESHOLD_MS."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            return self.get_response(request)
+        with connection.execute_wrapper(SlowQueryLogger(request)):
+            return self.get_response(request)
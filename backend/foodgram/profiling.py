@@ -0,0 +1,212 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+
+PROFILE_NAME = re.compile(
+    r'^(?P<time>\d+)-(?P<duration>\d+)ms-(?P<method>[A-Z]+)-'
+    r'(?P<endpoint>[\w.-]+)\.(?P<kind>folded|prof)$'
+)
+
+
+class StackSampler:
+    """
+    Сэмплирующий профилировщик одного потока.
+    Фоновый поток снимает стек через sys._current_frames и копит
+    свёрнутые стеки в формате flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name='stack-sampler', daemon=True
+        )
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while True:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} '
+                    f'({os.path.basename(code.co_filename)}:{frame.f_lineno})'
+                )
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            if self.stopped.wait(self.interval):
+                break
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.items():
+                file.write(f'{stack} {count}\n')
+
+
+class CProfileProfiler:
+    """Детерминированный профилировщик, результат — файл pstats."""
+
+    def __init__(self):
+        import cProfile
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+def is_admin(request):
+    """Администратор по сессии или по токену DRF из заголовка."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not header.startswith('Token '):
+        return False
+    from rest_framework.authtoken.models import Token
+    token = Token.objects.select_related('user').filter(
+        key=header[len('Token '):]
+    ).first()
+    return token is not None and token.user.is_staff
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запроса по заголовку X-Profile (только администраторам)
+    или случайной доли запросов PROFILING_SAMPLE_RATE.
+    Значение заголовка 'cprofile' включает cProfile, иначе сэмплирование.
+    Результаты пишутся в кольцевой каталог PROFILING_DIR.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.META.get('HTTP_X_PROFILE')
+        if mode and not is_admin(request):
+            mode = None
+        if not mode and random.random() < settings.PROFILING_SAMPLE_RATE:
+            mode = 'sample'
+        if not mode:
+            return self.get_response(request)
+
+        if mode == 'cprofile':
+            profiler, extension = CProfileProfiler(), 'prof'
+        else:
+            profiler = StackSampler(settings.PROFILING_INTERVAL)
+            extension = 'folded'
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        duration = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        endpoint = match.view_name if match else request.path
+        name = (
+            f'{int(time.time() * 1000)}-{int(duration)}ms-{request.method}-'
+            f'{re.sub(r"[^A-Za-z0-9.-]+", "_", endpoint).strip("_")}'
+            f'.{extension}'
+        )
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        profiler.save(os.path.join(settings.PROFILING_DIR, name))
+        self.trim()
+        return response
+
+    def trim(self):
+        """Удаление самых старых профилей сверх PROFILING_MAX_FILES."""
+        names = sorted(
+            name for name in os.listdir(settings.PROFILING_DIR)
+            if PROFILE_NAME.match(name)
+        )
+        for name in names[:-settings.PROFILING_MAX_FILES]:
+            os.remove(os.path.join(settings.PROFILING_DIR, name))
+
+
+def list_profiles():
+    """Сохранённые профили с разбором времени, длительности и эндпоинта."""
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(settings.PROFILING_DIR):
+        match = PROFILE_NAME.match(name)
+        if match:
+            profiles.append({
+                'name': name,
+                'time': time.strftime(
+                    '%Y-%m-%d %H:%M:%S',
+                    time.localtime(int(match['time']) / 1000)
+                ),
+                'duration': int(match['duration']),
+                'method': match['method'],
+                'endpoint': match['endpoint'],
+                'kind': match['kind'],
+            })
+    return profiles
+
+
+@staff_member_required
+def profiles_view(request):
+    """Страница админки со списком профилей по эндпоинтам и длительности."""
+    profiles = list_profiles()
+    order = request.GET.get('o', 'duration')
+    profiles.sort(
+        key=lambda profile: profile['time' if order == 'time' else 'duration'],
+        reverse=True
+    )
+    endpoints = {}
+    for profile in profiles:
+        summary = endpoints.setdefault(
+            profile['endpoint'], {'endpoint': profile['endpoint'],
+                                  'count': 0, 'max': 0, 'total': 0}
+        )
+        summary['count'] += 1
+        summary['total'] += profile['duration']
+        summary['max'] = max(summary['max'], profile['duration'])
+    for summary in endpoints.values():
+        summary['avg'] = summary['total'] // summary['count']
+    context = admin.site.each_context(request)
+    context.update({
+        'title': 'Профили запросов',
+        'profiles': profiles,
+        'endpoints': sorted(
+            endpoints.values(), key=lambda item: item['max'], reverse=True
+        ),
+    })
+    return render(request, 'admin/profiles.html', context)
+
+
+@staff_member_required
+def profile_download(request, name):
+    """Скачивание файла профиля."""
+    if not PROFILE_NAME.match(name):
+        raise Http404
+    path = os.path.join(settings.PROFILING_DIR, name)
+    if not os.path.exists(path):
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -34,6 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -45,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +55,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.middleware.SlowQueryMiddleware',
+    'foodgram.profiling.ProfilingMiddleware',
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -131,6 +136,14 @@ USE_TZ = False
 
 STATIC_URL = '/backend_static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# Хешированная и сжатая статика требует collectstatic, поэтому включается
+# только в образе, где его выполняет команда startup. В тестах и локально
+# {% static %} работает без манифеста.
+STATICFILES_STORAGE = (
+    'foodgram.storage.CompressedManifestStaticFilesStorage'
+    if os.getenv('STATIC_MANIFEST') == '1'
+    else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+)
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -153,4 +166,115 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'recipes_user': '120/min',
+        'recipes_ip': '300/min',
+        'shopping_cart_user': '10/min',
+        'shopping_cart_ip': '30/min',
+    },
+    # Перед бэкендом один nginx: IP клиента — последний адрес
+    # в X-Forwarded-For, который дописывает сам nginx.
+    'NUM_PROXIES': 1,
 }
+
+# Корзины token bucket для api.throttling: файл в общей памяти,
+# общий для всех воркеров gunicorn на хосте.
+THROTTLE_BUCKETS_PATH = os.getenv(
+    'THROTTLE_BUCKETS_PATH',
+    os.path.join(
+        '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+        'foodgram-throttle'
+    )
+)
+THROTTLE_BUCKETS_SLOTS = 65536
+
+# Кэш избранного, покупок и подписок в api.membership: число пользователей
+# в LRU воркера, срок жизни копии (в секундах) и файл поколений в общей памяти.
+MEMBERSHIP_CACHE_SIZE = 10000
+MEMBERSHIP_TTL = 60 * 5
+MEMBERSHIP_GENERATIONS_PATH = os.getenv(
+    'MEMBERSHIP_GENERATIONS_PATH',
+    os.path.join(
+        '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+        'foodgram-membership'
+    )
+)
+MEMBERSHIP_GENERATIONS_SLOTS = 65536
+
+# Короткие ссылки на рецепты: время жизни кэша кода и период
+# фоновой записи счётчиков переходов в БД (в секундах).
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
+SHORT_LINK_HITS_FLUSH_INTERVAL = 10
+
+# Время жизни закэшированного JSON рецепта без пользовательских признаков
+# (в секундах); сброс по сигналам, срок — страховка от пропущенных сбросов.
+# Поколения рецептов лежат в файле в общей памяти, общем для всех воркеров.
+RECIPE_FRAGMENT_TIMEOUT = 60 * 60
+RECIPE_GENERATIONS_PATH = os.getenv(
+    'RECIPE_GENERATIONS_PATH',
+    os.path.join(
+        '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+        'foodgram-recipes'
+    )
+)
+RECIPE_GENERATIONS_SLOTS = 262144
+
+# Популярные рецепты: размер топа, период полураспада очков,
+# окно учёта событий, период фонового пересчёта (в секундах)
+# и файл топа в общей памяти, общий для всех воркеров.
+TRENDING_SIZE = 100
+TRENDING_HALF_LIFE = 60 * 60 * 24 * 2
+TRENDING_WINDOW = 60 * 60 * 24 * 14
+TRENDING_REFRESH_INTERVAL = 60 * 5
+TRENDING_BOARD_PATH = os.getenv(
+    'TRENDING_BOARD_PATH',
+    os.path.join(
+        '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+        'foodgram-trending'
+    )
+)
+
+# Сжатие ответов в foodgram.middleware.CompressionMiddleware:
+# минимальный размер тела, уровни сжатия по типу содержимого
+# и файл счётчиков в общей памяти (страница admin/compression/).
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_METRICS_PATH = os.getenv(
+    'COMPRESSION_METRICS_PATH',
+    os.path.join(
+        '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+        'foodgram-compression'
+    )
+)
+COMPRESSION_LEVELS = {
+    'default': {'br': 5, 'zstd': 3, 'gzip': 6},
+    'application/json': {'br': 4, 'zstd': 3, 'gzip': 5},
+    'text/plain': {'br': 6, 'zstd': 6, 'gzip': 6},
+}
+
+# Журнал медленных SQL-запросов для manage.py index_advisor:
+# порог в миллисекундах (по умолчанию сбор выключен), доля записей
+# и размер журнала, после которого он переносится в <путь>.1.
+SLOW_QUERY_THRESHOLD_MS = (
+    float(os.getenv('SLOW_QUERY_THRESHOLD_MS'))
+    if os.getenv('SLOW_QUERY_THRESHOLD_MS') else None
+)
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_SAMPLE_RATE', 1))
+SLOW_QUERY_LOG = os.getenv(
+    'SLOW_QUERY_LOG', os.path.join(BASE_DIR, 'logs', 'slow_queries.jsonl')
+)
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+# Профилирование запросов в foodgram.profiling: доля случайных запросов,
+# интервал сэмплирования стека (в секундах) и кольцевой каталог профилей.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_INTERVAL = 0.005
+PROFILING_DIR = os.getenv(
+    'PROFILING_DIR', os.path.join(BASE_DIR, 'logs', 'profiles')
+)
+PROFILING_MAX_FILES = 200
+
+# Каталог загрузок рецептов из админки: исходный файл до окончания
+# импорта, журнал и итог команды import_recipes.
+RECIPE_IMPORTS_DIR = os.getenv(
+    'RECIPE_IMPORTS_DIR', os.path.join(BASE_DIR, 'logs', 'imports')
+)
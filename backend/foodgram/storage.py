@@ -0,0 +1,54 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.html', '.txt', '.json', '.xml',
+    '.ico', '.ttf', '.eot', '.otf',
+)
+MIN_COMPRESS_SIZE = 256
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Статика с хешем содержимого в имени файла и готовыми сжатыми копиями.
+    Рядом с каждым хешированным текстовым файлом collectstatic кладёт
+    .gz (и .br, если установлен brotli), чтобы nginx отдавал их
+    через gzip_static/brotli_static без сжатия на лету.
+    Файлы сжимаются параллельно: zlib и brotli отпускают GIL.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Промежуточные имена многопроходной обработки удаляются,
+        # поэтому сжимаются только итоговые файлы из манифеста.
+        with ThreadPoolExecutor() as pool:
+            list(pool.map(self.compress, set(self.hashed_files.values())))
+
+    def compress(self, name):
+        """Запись сжатых копий файла, если они меньше оригинала."""
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            content = file.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        variants = [('.gz', gzip.compress(content, 9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(content):
+                with open(path + suffix, 'wb') as file:
+                    file.write(compressed)
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
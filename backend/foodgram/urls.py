@@ -1,10 +1,24 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import include, path, re_path
+
+from api.views import short_link_redirect
+from foodgram.middleware import compression_view
+from foodgram.profiling import profile_download, profiles_view
+from recipes.stats import stats_view
 
 urlpatterns = [
     path('api/', include('api.urls')),
+    # Без завершающего слэша, чтобы не платить за редирект APPEND_SLASH.
+    re_path(r'^s/(?P<code>[0-9A-Za-z]+)/?$', short_link_redirect, name='short-link'),
+    path('admin/profiles/', profiles_view, name='admin-profiles'),
+    path(
+        'admin/profiles/<str:name>/', profile_download,
+        name='admin-profile-download'
+    ),
+    path('admin/stats/', stats_view, name='admin-stats'),
+    path('admin/compression/', compression_view, name='admin-compression'),
     path('admin/', admin.site.urls),
 ]
 
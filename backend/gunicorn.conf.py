@@ -0,0 +1,40 @@
+import os
+import time
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Явное скромное значение: cpu_count() в контейнере — число ядер хоста,
+# а у каждого воркера свои кэши фрагментов и наборов пользователя.
+workers = int(os.getenv('GUNICORN_WORKERS', 3))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+# Приложение импортируется один раз в мастере до форка воркеров:
+# воркеры стартуют быстрее и делят память через copy-on-write.
+preload_app = True
+
+# Время старта контейнера выставляет entrypoint.sh.
+boot_time = float(os.getenv('FOODGRAM_BOOT_TS', time.time()))
+
+
+def when_ready(server):
+    # URLconf со всеми вьюхами Django импортирует лениво на первом запросе,
+    # то есть в каждом воркере отдельно. Загружаем его в мастере до форка.
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    server.log.info(
+        'Gunicorn готов через %.2f с после старта контейнера',
+        time.time() - boot_time
+    )
+
+
+def post_fork(server, worker):
+    from django.db import connections
+    connections.close_all()
+
+
+def pre_request(worker, req):
+    if not getattr(worker, 'served_first_request', False):
+        worker.served_first_request = True
+        worker.log.info(
+            'Воркер %s: первый запрос через %.2f с после старта контейнера',
+            worker.pid, time.time() - boot_time
+        )
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django import forms
 from django.shortcuts import render
@@ -6,12 +7,23 @@ from django.http import HttpResponseRedirect
 from django.contrib import messages
 import logging
 import json
+import os
+import subprocess
+import sys
+import time
+import uuid
 
+from api.fragments import invalidate
+from .catalog import new_version
 from .models import (Favorite, Follow, Ingredient, IngredientRecipe,
-                     Recipe, ShoppingCart)
+                     Recipe, ShoppingCart, ShortLink)
+from users.models import User
 
 logger = logging.getLogger(__name__)
 
+# Сколько последних загрузок рецептов показывать на странице импорта.
+IMPORTS_SHOWN = 20
+
 
 class IngredientsInline(admin.TabularInline):
     """Админ-зона для интеграции добавления ингредиентов в рецепты."""
@@ -40,6 +52,13 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     search_fields = ('author',)
 
 
+class ShortLinkAdmin(admin.ModelAdmin):
+    """Админ-зона коротких ссылок."""
+    list_display = ('code', 'recipe', 'hits')
+    search_fields = ('code', 'recipe__name')
+    readonly_fields = ('hits',)
+
+
 class IngredientRecipeAdmin(admin.ModelAdmin):
     """Админ-зона ингредиентов для рецептов."""
     list_display = ('id', 'recipe', 'ingredient', 'amount',)
@@ -55,6 +74,101 @@ class RecipeAdmin(admin.ModelAdmin):
     filter_horizontal = ('ingredients',)
     empty_value_display = '-пусто-'
     inlines = [IngredientsInline]
+    change_list_template = 'admin/recipes_change_list.html'
+
+    def get_urls(self):
+        """Добавляем кастомный URL для массовой загрузки рецептов."""
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                'import-json/',
+                self.admin_site.admin_view(self.import_json),
+                name='import_recipes_json'
+            ),
+        ]
+        return custom_urls + urls
+
+    def import_json(self, request):
+        """
+        Массовая загрузка рецептов из JSON файла с картинками в base64.
+        Файл сохраняется в RECIPE_IMPORTS_DIR, а загрузку выполняет
+        команда import_recipes в отдельном процессе: большой файл
+        не уложился бы в таймаут воркера gunicorn.
+        """
+        if request.method == 'POST':
+            form = RecipeImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                name = self.start_import(
+                    request.FILES['json_file'], form.cleaned_data['author']
+                )
+                messages.success(
+                    request,
+                    f'Загрузка {name} запущена, итог появится в таблице ниже.'
+                )
+                return HttpResponseRedirect('.')
+        else:
+            form = RecipeImportForm(initial={'author': request.user})
+
+        context = self.admin_site.each_context(request)
+        context.update({
+            'form': form,
+            'imports': self.list_imports(),
+            'title': 'Загрузка рецептов из JSON',
+            'opts': self.model._meta,
+        })
+        return render(request, 'admin/recipes_import.html', context)
+
+    @staticmethod
+    def start_import(upload, author):
+        """Сохранение файла и запуск import_recipes вне процесса воркера."""
+        directory = settings.RECIPE_IMPORTS_DIR
+        os.makedirs(directory, exist_ok=True)
+        name = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:8]
+        source = os.path.join(directory, f'{name}.json')
+        with open(source, 'wb') as file:
+            for chunk in upload.chunks():
+                file.write(chunk)
+        with open(os.path.join(directory, f'{name}.log'), 'wb') as log:
+            subprocess.Popen(
+                [
+                    sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'),
+                    'import_recipes', source, '--author', author.email,
+                    '--report', os.path.join(directory, f'{name}.report.json'),
+                    '--remove',
+                ],
+                cwd=settings.BASE_DIR, stdout=log, stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL, start_new_session=True
+            )
+        return name
+
+    @staticmethod
+    def list_imports():
+        """Запущенные загрузки, новые сверху: итог из отчёта или «идёт»."""
+        directory = settings.RECIPE_IMPORTS_DIR
+        try:
+            logs = sorted(
+                (entry for entry in os.listdir(directory) if entry.endswith('.log')),
+                reverse=True
+            )[:IMPORTS_SHOWN]
+        except FileNotFoundError:
+            return []
+        imports = []
+        for log in logs:
+            name = log[:-len('.log')]
+            try:
+                with open(os.path.join(directory, f'{name}.report.json'), encoding='utf-8') as file:
+                    report = json.load(file)
+            except FileNotFoundError:
+                report = None
+            imports.append({
+                'name': name,
+                'report': report,
+                'errors': sorted(
+                    (report or {}).get('errors', {}).items(),
+                    key=lambda item: int(item[0])
+                ),
+            })
+        return imports
 
     def in_favorite(self, obj):
         """Количество добавленных рецептов в избранное."""
@@ -75,6 +189,12 @@ class JsonUploadForm(forms.Form):
     json_file = forms.FileField(label='JSON файл с ингредиентами')
 
 
+class RecipeImportForm(forms.Form):
+    """Форма для массовой загрузки рецептов."""
+    json_file = forms.FileField(label='JSON файл с рецептами')
+    author = forms.ModelChoiceField(queryset=User.objects.all(), label='Автор рецептов')
+
+
 class IngredientAdmin(admin.ModelAdmin):
     """Админ-зона ингредиентов с возможностью загрузки из JSON."""
     list_display = ('name', 'measurement_unit')
@@ -91,6 +211,41 @@ class IngredientAdmin(admin.ModelAdmin):
         ]
         return custom_urls + urls
 
+    def import_ingredients(self, data):
+        """
+        Загрузка ингредиентов пачкой: новые создаются, у существующих
+        обновляется только изменившаяся единица измерения, чтобы версия
+        справочника менялась лишь у действительно изменённых строк.
+        """
+        existing = {
+            ingredient.name: ingredient
+            for ingredient in Ingredient.objects.filter(
+                name__in=[item['name'] for item in data]
+            )
+        }
+        version = new_version()
+        created, updated = {}, []
+        for item in data:
+            ingredient = existing.get(item['name'])
+            if ingredient is None:
+                created[item['name']] = Ingredient(
+                    name=item['name'],
+                    measurement_unit=item['measurement_unit'],
+                    version=version
+                )
+            elif ingredient.measurement_unit != item['measurement_unit']:
+                ingredient.measurement_unit = item['measurement_unit']
+                ingredient.version = version
+                updated.append(ingredient)
+        Ingredient.objects.bulk_create(created.values(), batch_size=1000)
+        Ingredient.objects.bulk_update(
+            updated, ['measurement_unit', 'version'], batch_size=1000
+        )
+        invalidate(IngredientRecipe.objects.filter(
+            ingredient__in=updated
+        ).values_list('recipe_id', flat=True).distinct())
+        return len(created), len(updated)
+
     def upload_json(self, request):
         """Загрузка ингредиентов из JSON файла."""
         logger.warning("upload_json view called")
@@ -100,17 +255,7 @@ class IngredientAdmin(admin.ModelAdmin):
                 if form.is_valid():
                     json_file = request.FILES['json_file']
                     data = json.loads(json_file.read().decode('utf-8'))
-                    created_count = 0
-                    updated_count = 0
-                    for item in data:
-                        obj, created = Ingredient.objects.update_or_create(
-                            name=item['name'],
-                            defaults={'measurement_unit': item['measurement_unit']}
-                        )
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
+                    created_count, updated_count = self.import_ingredients(data)
                     messages.success(
                         request,
                         f"Успешно загружено! Создано: {created_count}, Обновлено: {updated_count}"
@@ -138,5 +283,6 @@ admin.site.register(IngredientRecipe, IngredientRecipeAdmin)
 admin.site.register(Follow, FollowAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(ShortLink, ShortLinkAdmin)
 
 
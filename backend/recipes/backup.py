@@ -0,0 +1,195 @@
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from recipes.media import MEDIA_FIELDS
+from recipes.models import (Favorite, Follow, Ingredient, IngredientRecipe,
+                            Recipe, ShoppingCart)
+from users.models import User
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+# Порядок важен: при загрузке родительские таблицы идут раньше зависимых.
+MODELS = (User, Ingredient, Recipe, IngredientRecipe, Follow, Favorite, ShoppingCart)
+
+
+def table_columns(model):
+    """Имя таблицы и столбцы модели в кавычках для SQL."""
+    quote = connection.ops.quote_name
+    return (
+        quote(model._meta.db_table),
+        [quote(field.column) for field in model._meta.concrete_fields]
+    )
+
+
+def add_bytes(archive, name, data):
+    """Запись блока байтов в архив под заданным именем."""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    archive.addfile(info, io.BytesIO(data))
+
+
+def dump_model(cursor, model, chunk_size):
+    """
+    Выгрузка таблицы в CSV через COPY порциями по первичному ключу.
+    Граница порции — max(pk) среди следующих chunk_size строк,
+    поэтому каждая порция читается по индексу без OFFSET.
+    """
+    table, columns = table_columns(model)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    raw = cursor.cursor
+    output = tempfile.TemporaryFile()
+    rows, last = 0, None
+    while True:
+        lower = '' if last is None else f'WHERE {pk} > {int(last)}'
+        cursor.execute(
+            f'SELECT max({pk}) FROM (SELECT {pk} FROM {table} {lower} '
+            f'ORDER BY {pk} LIMIT %s) AS chunk',
+            [chunk_size]
+        )
+        upper = cursor.fetchone()[0]
+        if upper is None:
+            break
+        condition = f'{pk} <= {int(upper)}'
+        if last is not None:
+            condition = f'{pk} > {int(last)} AND {condition}'
+        raw.copy_expert(
+            f'COPY (SELECT {", ".join(columns)} FROM {table} '
+            f'WHERE {condition} ORDER BY {pk}) TO STDOUT WITH (FORMAT csv)',
+            output
+        )
+        rows += raw.rowcount
+        last = upper
+    output.seek(0)
+    return output, rows
+
+
+def media_names():
+    """Уникальные имена файлов, на которые ссылаются записи в БД."""
+    names = set()
+    for model, field in MEDIA_FIELDS:
+        names.update(
+            model.objects.exclude(**{field: ''}).exclude(
+                **{f'{field}__isnull': True}
+            ).values_list(field, flat=True).iterator()
+        )
+    return sorted(names)
+
+
+def export_archive(path, chunk_size=10000, with_media=True):
+    """
+    Потоковая выгрузка данных и медиафайлов в архив tar.gz.
+    Все таблицы читаются из одного снимка REPEATABLE READ.
+    Возвращает число строк по моделям и число упакованных файлов.
+    """
+    stats = {}
+    media = missing = 0
+    with tarfile.open(path, 'w:gz') as archive:
+        manifest = {'format': FORMAT_VERSION, 'models': []}
+        dumps = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY'
+            )
+            for model in MODELS:
+                output, rows = dump_model(cursor, model, chunk_size)
+                dumps.append((model, output))
+                stats[model._meta.label] = rows
+                manifest['models'].append({
+                    'label': model._meta.label,
+                    'columns': [field.column for field in model._meta.concrete_fields],
+                    'rows': rows,
+                })
+            names = media_names() if with_media else []
+        add_bytes(archive, MANIFEST, json.dumps(manifest, indent=2).encode())
+        for model, output in dumps:
+            with output:
+                info = tarfile.TarInfo(f'data/{model._meta.label}.csv')
+                info.size = os.fstat(output.fileno()).st_size
+                archive.addfile(info, output)
+        for name in names:
+            source = os.path.join(settings.MEDIA_ROOT, name)
+            if os.path.isfile(source):
+                archive.add(source, arcname=f'media/{name}', recursive=False)
+                media += 1
+            else:
+                missing += 1
+    return stats, media, missing
+
+
+def media_target(name):
+    """Путь файла в MEDIA_ROOT с защитой от выхода за его пределы."""
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    target = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, target]) != root:
+        raise ValueError(f'Недопустимое имя файла в архиве: {name}')
+    return target
+
+
+def import_archive(path, replace=False):
+    """
+    Загрузка архива export_archive: таблицы через COPY FROM STDIN
+    с исходными id в одной транзакции, затем сброс последовательностей.
+    Архив читается потоково, без распаковки на диск.
+    """
+    models = {model._meta.label: model for model in MODELS}
+    stats = {}
+    media = 0
+    with tarfile.open(path, 'r|gz') as archive, transaction.atomic():
+        cursor = connection.cursor()
+        manifest = None
+        for member in archive:
+            if member.name == MANIFEST:
+                manifest = json.load(archive.extractfile(member))
+                if manifest.get('format') != FORMAT_VERSION:
+                    raise ValueError(
+                        f'Неподдерживаемая версия архива: {manifest.get("format")}'
+                    )
+                prepare_tables(cursor, replace)
+            elif member.name.startswith('data/'):
+                if manifest is None:
+                    raise ValueError('В начале архива нет manifest.json.')
+                label = member.name[len('data/'):-len('.csv')]
+                entry = next(
+                    item for item in manifest['models'] if item['label'] == label
+                )
+                table, _ = table_columns(models[label])
+                columns = ', '.join(
+                    connection.ops.quote_name(column) for column in entry['columns']
+                )
+                cursor.cursor.copy_expert(
+                    f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                    archive.extractfile(member)
+                )
+                stats[label] = entry['rows']
+            elif member.name.startswith('media/') and member.isfile():
+                target = media_target(member.name[len('media/'):])
+                if not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with open(target, 'wb') as output:
+                        shutil.copyfileobj(archive.extractfile(member), output)
+                    media += 1
+        for sql in connection.ops.sequence_reset_sql(no_style(), MODELS):
+            cursor.execute(sql)
+    return stats, media
+
+
+def prepare_tables(cursor, replace):
+    """Очистка таблиц перед загрузкой или проверка, что они пусты."""
+    tables = [table_columns(model)[0] for model in MODELS]
+    if replace:
+        cursor.execute(f'TRUNCATE {", ".join(tables)} CASCADE')
+        return
+    for model in MODELS:
+        if model.objects.exists():
+            raise ValueError(
+                f'Таблица {model._meta.db_table} не пуста, '
+                f'используйте --replace.'
+            )
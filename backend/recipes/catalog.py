@@ -0,0 +1,65 @@
+import gzip
+import json
+import time
+
+from django.core.cache import cache
+from django.db.models import Max
+
+from recipes.models import DeletedIngredient, Ingredient
+
+CACHE_KEY = 'ingredient-catalog'
+# Запас для дельты: строки, записанные транзакциями, которые
+# закоммитились позже выдачи версии клиенту, не потеряются.
+DELTA_MARGIN = 60 * 10 ** 6
+
+
+def new_version():
+    """Версия справочника — текущее время в микросекундах."""
+    return time.time_ns() // 1000
+
+
+def current_version():
+    """Последняя версия справочника по индексам version."""
+    return max(
+        Ingredient.objects.aggregate(version=Max('version'))['version'] or 0,
+        DeletedIngredient.objects.aggregate(
+            version=Max('version')
+        )['version'] or 0
+    )
+
+
+def snapshot(version):
+    """
+    Весь справочник одним сжатым gzip блоком JSON.
+    Пересобирается, только если версия изменилась.
+    """
+    cached = cache.get(CACHE_KEY)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    payload = json.dumps(
+        {
+            'version': version,
+            'ingredients': list(Ingredient.objects.order_by('id').values_list(
+                'id', 'name', 'measurement_unit'
+            ))
+        },
+        ensure_ascii=False,
+        separators=(',', ':')
+    ).encode()
+    blob = gzip.compress(payload, 9, mtime=0)
+    cache.set(CACHE_KEY, (version, blob), None)
+    return blob
+
+
+def delta(since, version):
+    """Изменённые и удалённые ингредиенты с версии since."""
+    since = max(since - DELTA_MARGIN, 0)
+    return {
+        'version': version,
+        'ingredients': list(Ingredient.objects.filter(
+            version__gt=since
+        ).order_by('id').values_list('id', 'name', 'measurement_unit')),
+        'deleted': list(DeletedIngredient.objects.filter(
+            version__gt=since
+        ).values_list('ingredient_id', flat=True))
+    }
@@ -0,0 +1,205 @@
+import base64
+import binascii
+import io
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connections, transaction
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe
+
+RECIPE_FIELDS = ('name', 'text', 'cooking_time')
+
+
+def clean_field(model, name, value):
+    """Проверка значения валидаторами поля модели без запросов к БД."""
+    try:
+        return model._meta.get_field(name).clean(value, None)
+    except ValidationError as error:
+        raise ValidationError({name: error.messages})
+
+
+def clean_record(record):
+    """
+    Проверка одной записи без обращения к БД.
+    Возвращает поля рецепта, строку изображения и ингредиенты.
+    """
+    if not isinstance(record, dict):
+        raise ValidationError({'non_field_errors': ['Запись должна быть объектом.']})
+    fields = {
+        name: clean_field(Recipe, name, record.get(name))
+        for name in RECIPE_FIELDS
+    }
+    image = record.get('image')
+    if not isinstance(image, str) or not image:
+        raise ValidationError({'image': ['Нужна картинка в base64.']})
+    items = record.get('ingredients')
+    if not isinstance(items, list) or not items:
+        raise ValidationError({'ingredients': ['Нужно выбрать ингредиент!']})
+    ingredients = {}
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValidationError({'ingredients': ['Неверный формат ингредиента.']})
+        ingredient_id = item.get('id')
+        if not isinstance(ingredient_id, int) or ingredient_id < 1:
+            raise ValidationError({'ingredients': ['Неверный id ингредиента.']})
+        if ingredient_id in ingredients:
+            raise ValidationError({'ingredients': ['Ингредиенты повторяются!']})
+        ingredients[ingredient_id] = clean_field(
+            IngredientRecipe, 'amount', item.get('amount')
+        )
+    return fields, image, ingredients
+
+
+def init_worker():
+    """Настройка Django в процессе пула, если он запущен через spawn."""
+    django.setup()
+
+
+def save_image(data, upload_to):
+    """
+    Декодирование base64, проверка картинки через Pillow и сохранение
+    в хранилище. Выполняется в процессе пула, возвращает имя файла.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    if data.startswith('data:') and ';base64,' in data:
+        data = data.split(';base64,', 1)[1]
+    try:
+        content = base64.b64decode(data, validate=True)
+        with Image.open(io.BytesIO(content)) as image:
+            extension = image.format.lower()
+            image.verify()
+    except (binascii.Error, ValueError, UnidentifiedImageError):
+        raise ValueError('Не удалось прочитать картинку.')
+    extension = 'jpg' if extension == 'jpeg' else extension
+    return default_storage.save(
+        f'{upload_to}{uuid.uuid4().hex}.{extension}', ContentFile(content)
+    )
+
+
+class RecipeImporter:
+    """
+    Массовая загрузка рецептов одного автора.
+    Все ингредиенты и существующие имена проверяются одним запросом,
+    картинки декодируются и сохраняются в пуле процессов, рецепты
+    и их ингредиенты вставляются bulk_create порциями в транзакциях.
+    Ошибки копятся по номерам записей и не прерывают загрузку.
+    """
+
+    def __init__(self, author, chunk_size=500, workers=None):
+        self.author = author
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.errors = {}
+        self.created = 0
+
+    def error(self, index, message):
+        """Ошибка записи с данным номером."""
+        self.errors[index] = message
+
+    def run(self, records):
+        """Загрузка списка записей, возвращает число созданных и ошибки."""
+        valid = self.validate(records)
+        self.save_images(valid)
+        valid = [item for item in valid if item[0] not in self.errors]
+        for start in range(0, len(valid), self.chunk_size):
+            self.insert(valid[start:start + self.chunk_size])
+        return self.created, self.errors
+
+    def validate(self, records):
+        """Проверка записей и ссылок на ингредиенты и имена в БД."""
+        valid = []
+        for index, record in enumerate(records):
+            try:
+                valid.append((index, *clean_record(record)))
+            except ValidationError as error:
+                self.error(index, error.message_dict)
+        ingredient_ids = {
+            ingredient_id for _, _, _, ingredients in valid
+            for ingredient_id in ingredients
+        }
+        known = set(Ingredient.objects.filter(
+            id__in=ingredient_ids
+        ).values_list('id', flat=True))
+        taken = set(Recipe.objects.filter(
+            author=self.author,
+            name__in=[fields['name'] for _, fields, _, _ in valid]
+        ).values_list('name', flat=True))
+        checked = []
+        for index, fields, image, ingredients in valid:
+            missing = sorted(set(ingredients) - known)
+            if missing:
+                self.error(index, {'ingredients': [
+                    f'Ингредиенты не найдены: {missing}'
+                ]})
+            elif fields['name'] in taken:
+                self.error(index, {'name': [
+                    'У автора уже есть рецепт с таким названием.'
+                ]})
+            else:
+                taken.add(fields['name'])
+                checked.append([index, fields, image, ingredients])
+        return checked
+
+    def save_images(self, valid):
+        """Декодирование и сохранение картинок в пуле процессов."""
+        upload_to = Recipe._meta.get_field('image').upload_to
+        # Дочерние процессы не должны унаследовать открытое соединение с БД.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=init_worker
+        ) as executor:
+            futures = [
+                executor.submit(save_image, item[2], upload_to)
+                for item in valid
+            ]
+            for item, future in zip(valid, futures):
+                try:
+                    item[2] = future.result()
+                except ValueError as error:
+                    self.error(item[0], {'image': [str(error)]})
+
+    def insert(self, chunk):
+        """
+        Вставка порции одной транзакцией. Если порция падает
+        (например, параллельно создан рецепт с тем же именем),
+        записи вставляются по одной, чтобы найти виноватую.
+        """
+        try:
+            with transaction.atomic():
+                self.bulk_insert(chunk)
+        except IntegrityError:
+            for item in chunk:
+                try:
+                    with transaction.atomic():
+                        self.bulk_insert([item])
+                except IntegrityError as error:
+                    self.error(item[0], {'non_field_errors': [str(error)]})
+
+    def bulk_insert(self, chunk):
+        """Рецепты порции одним INSERT, их ингредиенты — вторым."""
+        recipes = Recipe.objects.bulk_create(
+            Recipe(author=self.author, image=image, **fields)
+            for _, fields, image, _ in chunk
+        )
+        if any(recipe.pk is None for recipe in recipes):
+            # БД без RETURNING при bulk_create: id берутся по уникальному имени.
+            ids = dict(Recipe.objects.filter(
+                author=self.author,
+                name__in=[recipe.name for recipe in recipes]
+            ).values_list('name', 'id'))
+            for recipe in recipes:
+                recipe.pk = ids[recipe.name]
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for recipe, (_, _, _, ingredients) in zip(recipes, chunk)
+            for ingredient_id, amount in ingredients.items()
+        )
+        self.created += len(recipes)
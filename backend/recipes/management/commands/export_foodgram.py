@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipes.backup import export_archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, ингредиенты, рецепты, подписки, избранное '
+        'и списки покупок вместе с медиафайлами в архив tar.gz.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к создаваемому архиву.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=10000,
+            help='Сколько строк выгружать одним COPY.'
+        )
+        parser.add_argument(
+            '--no-media', action='store_true',
+            help='Не упаковывать медиафайлы.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Команда работает только с PostgreSQL.')
+        stats, media, missing = export_archive(
+            options['path'],
+            chunk_size=options['chunk_size'],
+            with_media=not options['no_media']
+        )
+        for label, rows in stats.items():
+            self.stdout.write(f'{label}: {rows}')
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'Файлов нет на диске: {missing}.'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Архив {options["path"]} создан, медиафайлов: {media}.'
+        ))
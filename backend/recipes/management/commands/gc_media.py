@@ -0,0 +1,104 @@
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.media import MEDIA_FIELDS
+
+
+def scan_files(path):
+    """Потоковый обход каталога через os.scandir без построения списка."""
+    stack = [path]
+    while stack:
+        try:
+            iterator = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет или переносит в карантин файлы из MEDIA_ROOT, '
+        'на которые не ссылается ни один рецепт или пользователь.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы-сироты, ничего не удаляя.'
+        )
+        parser.add_argument(
+            '--quarantine', metavar='DIR',
+            help='Переносить файлы-сироты в каталог вместо удаления.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько файлов проверять в БД одним запросом.'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе указанного числа секунд.'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.orphans = 0
+        self.freed = 0
+        checked = 0
+        deadline = time.time() - options['min_age']
+        for model, field in MEDIA_FIELDS:
+            upload_to = model._meta.get_field(field).upload_to
+            batch = []
+            for entry in scan_files(
+                os.path.join(settings.MEDIA_ROOT, upload_to)
+            ):
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > deadline:
+                    continue
+                name = os.path.relpath(
+                    entry.path, settings.MEDIA_ROOT
+                ).replace(os.sep, '/')
+                batch.append((name, entry.path, stat.st_size))
+                if len(batch) >= options['batch_size']:
+                    self.collect(batch)
+                    checked += len(batch)
+                    batch = []
+            if batch:
+                self.collect(batch)
+                checked += len(batch)
+        action = 'Найдено' if options['dry_run'] else 'Обработано'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено файлов: {checked}. {action} сирот: {self.orphans}, '
+            f'{self.freed / 1024 / 1024:.1f} МБ.'
+        ))
+
+    def collect(self, batch):
+        """Проверка пачки файлов по всем полям с медиа и обработка сирот."""
+        names = [name for name, _, _ in batch]
+        referenced = set()
+        for model, field in MEDIA_FIELDS:
+            referenced.update(model.objects.filter(
+                **{f'{field}__in': names}
+            ).values_list(field, flat=True))
+        for name, path, size in batch:
+            if name in referenced:
+                continue
+            self.orphans += 1
+            self.freed += size
+            if self.options['dry_run']:
+                self.stdout.write(name)
+            elif self.options['quarantine']:
+                target = os.path.join(self.options['quarantine'], name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                # Карантин часто на другом разделе, где os.replace даёт EXDEV.
+                shutil.move(path, target)
+            else:
+                os.remove(path)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipes.backup import import_archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает архив export_foodgram: данные через COPY с исходными id, '
+        'сброс последовательностей и распаковка медиафайлов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к архиву.')
+        parser.add_argument(
+            '--replace', action='store_true',
+            help=(
+                'Очистить таблицы перед загрузкой (TRUNCATE ... CASCADE, '
+                'включая зависящие от них токены, короткие ссылки и т.п.).'
+            )
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Команда работает только с PostgreSQL.')
+        try:
+            stats, media = import_archive(options['path'], replace=options['replace'])
+        except ValueError as error:
+            raise CommandError(error)
+        for label, rows in stats.items():
+            self.stdout.write(f'{label}: {rows}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Архив загружен, новых медиафайлов: {media}. '
+            f'Похожие рецепты: manage.py rebuild_similarity.'
+        ))
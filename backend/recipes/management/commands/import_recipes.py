@@ -0,0 +1,86 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from recipes.importer import RecipeImporter
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Массовая загрузка рецептов из JSON-списка с картинками в base64. '
+        'Ошибки выводятся по номерам записей и не прерывают загрузку.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON-файл со списком рецептов.')
+        parser.add_argument(
+            '--author', required=True,
+            help='Email или username автора всех рецептов.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько рецептов вставлять одной транзакцией.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Число процессов для декодирования картинок.'
+        )
+        parser.add_argument(
+            '--report', metavar='PATH',
+            help='Записать итог загрузки в JSON-файл (для страницы админки).'
+        )
+        parser.add_argument(
+            '--remove', action='store_true',
+            help='Удалить исходный файл после загрузки.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            created, errors = self.load(options)
+        except Exception as error:
+            self.report(options, {'failed': str(error)})
+            raise
+        finally:
+            if options['remove'] and os.path.exists(options['path']):
+                os.remove(options['path'])
+        self.report(options, {
+            'created': created,
+            'errors': {index: errors[index] for index in sorted(errors)},
+        })
+        for index, error in sorted(errors.items()):
+            self.stderr.write(
+                f'#{index}: {json.dumps(error, ensure_ascii=False)}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано рецептов: {created}, с ошибками: {len(errors)}. '
+            f'Похожие рецепты: manage.py rebuild_similarity.'
+        ))
+
+    def load(self, options):
+        author = User.objects.filter(
+            Q(email=options['author']) | Q(username=options['author'])
+        ).first()
+        if author is None:
+            raise CommandError(f'Автор {options["author"]} не найден.')
+        with open(options['path'], encoding='utf-8') as file:
+            records = json.load(file)
+        if not isinstance(records, list):
+            raise CommandError('Ожидается JSON-список рецептов.')
+        return RecipeImporter(
+            author,
+            chunk_size=options['chunk_size'],
+            workers=options['workers']
+        ).run(records)
+
+    def report(self, options, result):
+        """Итог в файл отчёта: пишется во временный и переименовывается."""
+        if not options['report']:
+            return
+        result['finished'] = time.time()
+        with open(options['report'] + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(result, file, ensure_ascii=False)
+        os.replace(options['report'] + '.tmp', options['report'])
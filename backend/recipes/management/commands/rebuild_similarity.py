@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает индекс похожих рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк сохранять в БД за один запрос.'
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс похожих рецептов перестроен, записей: {total}.'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.stats import refresh
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет таблицы сводок для страницы статистики в админке. '
+        'По умолчанию учитывает только строки, добавленные после прошлого '
+        'запуска; --full пересчитывает всё и учитывает удаления.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Полный пересчёт всех сводок.'
+        )
+
+    def handle(self, *args, **options):
+        for name, affected in refresh(full=options['full']).items():
+            self.stdout.write(f'{name}: {affected}')
+        self.stdout.write(self.style.SUCCESS('Сводки обновлены.'))
@@ -0,0 +1,9 @@
+from recipes.models import Recipe
+from users.models import User
+
+# Поля моделей с файлами из MEDIA_ROOT: по ним ищутся файлы-сироты
+# и собираются медиафайлы для резервной копии.
+MEDIA_FIELDS = (
+    (Recipe, 'image'),
+    (User, 'avatar'),
+)
@@ -0,0 +1,75 @@
+# Generated by Django 3.2.6 on 2026-10-19 10:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def drop_tags(apps, schema_editor):
+    """
+    Удаление тегов, если их таблицы ещё есть в БД. Прежний entrypoint
+    запускал makemigrations при каждом старте, и на развёрнутых базах
+    эти изменения уже применены миграцией с автоматическим именем.
+    """
+    tables = schema_editor.connection.introspection.table_names()
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Tag = apps.get_model('recipes', 'Tag')
+    tags = Recipe._meta.get_field('tags')
+    if tags.remote_field.through._meta.db_table in tables:
+        schema_editor.remove_field(Recipe, tags)
+    if Tag._meta.db_table in tables:
+        schema_editor.delete_model(Tag)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredientrecipe',
+            options={'verbose_name': 'Состав рецепта', 'verbose_name_plural': 'Состав рецепта'},
+        ),
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ['-id'], 'verbose_name': 'Рецепт', 'verbose_name_plural': 'Рецепты'},
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorite', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(help_text='Автор рецепта', on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Автор рецепта'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(help_text='Добавьте изображение рецепта', upload_to='recipes/', verbose_name='Картинка рецепта'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(through='recipes.IngredientRecipe', to='recipes.Ingredient', verbose_name='Ингредиенты'),
+        ),
+        # Откат восстанавливает только состояние моделей, не таблицы тегов.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(drop_tags, migrations.RunPython.noop),
+            ],
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='recipe',
+                    name='tags',
+                ),
+                migrations.DeleteModel(
+                    name='Tag',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.6 on 2026-10-19 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_added_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedIngredient',
+            fields=[
+                ('ingredient_id', models.PositiveIntegerField(primary_key=True, serialize=False, verbose_name='Id ингредиента')),
+                ('version', models.PositiveBigIntegerField(db_index=True, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Удалённый ингредиент',
+                'verbose_name_plural': 'Удалённые ингредиенты',
+            },
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='version',
+            field=models.PositiveBigIntegerField(db_index=True, default=0, editable=False, verbose_name='Версия'),
+        ),
+    ]
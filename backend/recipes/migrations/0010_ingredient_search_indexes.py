@@ -0,0 +1,27 @@
+# Generated by Django 3.2.6 on 2026-10-19 10:32
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_cooking_time_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='ingredient_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        # Функциональный индекс с классом операторов в Django 3.2
+        # не описать через Meta.indexes.
+        migrations.RunSQL(
+            'CREATE INDEX ingredient_name_lower_idx ON recipes_ingredient '
+            '(lower(name) text_pattern_ops);',
+            reverse_sql='DROP INDEX ingredient_name_lower_idx;',
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 3.2.6 on 2026-10-19 10:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_avatar'),
+        ('recipes', '0010_ingredient_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='users.user', verbose_name='Автор')),
+                ('recipes', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Рецептов')),
+                ('followers', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.CreateModel(
+            name='CartSize',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cart_size', serialize=False, to='users.user', verbose_name='Пользователь')),
+                ('recipes', models.PositiveIntegerField(default=0, verbose_name='Рецептов')),
+            ],
+            options={
+                'verbose_name': 'Размер списка покупок',
+                'verbose_name_plural': 'Размеры списков покупок',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRecipeStats',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False, verbose_name='День')),
+                ('recipes', models.PositiveIntegerField(default=0, verbose_name='Рецептов')),
+            ],
+            options={
+                'verbose_name': 'Новые рецепты за день',
+                'verbose_name_plural': 'Новые рецепты по дням',
+            },
+        ),
+        migrations.CreateModel(
+            name='IngredientUsage',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('recipes', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Рецептов')),
+            ],
+            options={
+                'verbose_name': 'Использование ингредиента',
+                'verbose_name_plural': 'Использование ингредиентов',
+            },
+        ),
+        migrations.CreateModel(
+            name='StatsWatermark',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Таблица')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='Последний id')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Отметка обновления сводок',
+                'verbose_name_plural': 'Отметки обновления сводок',
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.db.models import Q, F
@@ -17,16 +18,53 @@ class Ingredient(models.Model):
         max_length=200,
         help_text='Введите единицу измерения'
     )
+    version = models.PositiveBigIntegerField(
+        verbose_name='Версия',
+        default=0,
+        db_index=True,
+        editable=False
+    )
 
     class Meta:
         ordering = ['id']
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        # Индекс lower(name) text_pattern_ops для поиска по началу
+        # названия создаётся в миграции 0010 через RunSQL.
+        indexes = [
+            GinIndex(
+                fields=['name'],
+                name='ingredient_name_trgm_idx',
+                opclasses=['gin_trgm_ops']
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
+class DeletedIngredient(models.Model):
+    """
+    Удалённые ингредиенты для дельта-синхронизации справочника.
+    Версия — момент удаления в микросекундах, как у Ingredient.version.
+    """
+    ingredient_id = models.PositiveIntegerField(
+        verbose_name='Id ингредиента',
+        primary_key=True
+    )
+    version = models.PositiveBigIntegerField(
+        verbose_name='Версия',
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Удалённый ингредиент'
+        verbose_name_plural = 'Удалённые ингредиенты'
+
+    def __str__(self):
+        return str(self.ingredient_id)
+
+
 class Recipe(models.Model):
     """
     Модель для рецептов.
@@ -78,6 +116,16 @@ class Recipe(models.Model):
                 name='unique_recipe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_id_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', '-id'],
+                name='recipe_cooking_time_idx'
+            )
+        ]
 
 
 class IngredientRecipe(models.Model):
@@ -115,6 +163,12 @@ class IngredientRecipe(models.Model):
                 name='unique_ingredients'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['ingredient', 'recipe'],
+                name='ingredient_recipe_idx'
+            )
+        ]
 
     def __str__(self):
         return f'{self.ingredient} {self.amount}'
@@ -138,6 +192,11 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         help_text='Выберите рецепт для приготовления'
     )
+    added_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Список покупок'
@@ -170,6 +229,11 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Рецепт'
     )
+    added_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Избранные рецепты'
@@ -221,3 +285,161 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'Пользователь {self.user} подписан на {self.author}'
+
+
+class ShortLink(models.Model):
+    """
+    Короткая ссылка на рецепт.
+    Код — id рецепта в base62, хранится с уникальным индексом.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        related_name='short_link',
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE
+    )
+    code = models.CharField(
+        verbose_name='Код ссылки',
+        max_length=16,
+        unique=True
+    )
+    hits = models.PositiveIntegerField(
+        verbose_name='Количество переходов',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Короткая ссылка'
+        verbose_name_plural = 'Короткие ссылки'
+
+    def __str__(self):
+        return self.code
+
+
+class RecipeSimilarity(models.Model):
+    """
+    Похожие рецепты по пересечению ингредиентов (коэффициент Жаккара).
+    Заполняется командой rebuild_similarity и обновляется
+    при изменении состава рецепта.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name='similarities',
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        related_name='+',
+        verbose_name='Похожий рецепт',
+        on_delete=models.CASCADE
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similarity'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='similarity_score_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar}: {self.score:.2f}'
+
+
+class IngredientUsage(models.Model):
+    """Сводка: в скольких рецептах используется ингредиент."""
+    ingredient = models.OneToOneField(
+        Ingredient,
+        primary_key=True,
+        related_name='usage',
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE
+    )
+    recipes = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Использование ингредиента'
+        verbose_name_plural = 'Использование ингредиентов'
+
+
+class AuthorStats(models.Model):
+    """Сводка: число рецептов и подписчиков автора."""
+    author = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор',
+        on_delete=models.CASCADE
+    )
+    recipes = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        db_index=True
+    )
+    followers = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+
+class DailyRecipeStats(models.Model):
+    """Сводка: число новых рецептов за день."""
+    date = models.DateField(verbose_name='День', primary_key=True)
+    recipes = models.PositiveIntegerField(verbose_name='Рецептов', default=0)
+
+    class Meta:
+        verbose_name = 'Новые рецепты за день'
+        verbose_name_plural = 'Новые рецепты по дням'
+
+
+class CartSize(models.Model):
+    """Сводка: число рецептов в списке покупок пользователя."""
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='cart_size',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE
+    )
+    recipes = models.PositiveIntegerField(verbose_name='Рецептов', default=0)
+
+    class Meta:
+        verbose_name = 'Размер списка покупок'
+        verbose_name_plural = 'Размеры списков покупок'
+
+
+class StatsWatermark(models.Model):
+    """
+    Отметка инкрементального обновления сводок:
+    максимальный уже учтённый id исходной таблицы.
+    """
+    name = models.CharField(
+        verbose_name='Таблица',
+        max_length=64,
+        primary_key=True
+    )
+    last_id = models.BigIntegerField(verbose_name='Последний id', default=0)
+    updated_at = models.DateTimeField(verbose_name='Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Отметка обновления сводок'
+        verbose_name_plural = 'Отметки обновления сводок'
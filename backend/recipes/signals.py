@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from recipes.catalog import new_version
+from recipes.models import DeletedIngredient, Ingredient
+
+
+@receiver(pre_save, sender=Ingredient)
+def bump_ingredient_version(sender, instance, **kwargs):
+    """Новая версия справочника при сохранении ингредиента."""
+    instance.version = new_version()
+
+
+@receiver(post_delete, sender=Ingredient)
+def record_deleted_ingredient(sender, instance, **kwargs):
+    """Запись об удалении для дельта-синхронизации."""
+    DeletedIngredient.objects.update_or_create(
+        ingredient_id=instance.id, defaults={'version': new_version()}
+    )
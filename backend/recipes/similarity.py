@@ -0,0 +1,88 @@
+import heapq
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+
+from recipes.models import IngredientRecipe, Recipe, RecipeSimilarity
+
+TOP_K = 10
+
+
+def similar_scores(recipe_id, top_k=TOP_K):
+    """
+    Топ рецептов по коэффициенту Жаккара для заданного рецепта.
+    Кандидаты — только рецепты с общими ингредиентами, их выборка
+    идёт по индексу (ingredient, recipe), а не перебором всех пар.
+    """
+    ingredients = IngredientRecipe.objects.filter(recipe_id=recipe_id)
+    size = ingredients.count()
+    if not size:
+        return []
+    candidate_size = IngredientRecipe.objects.filter(
+        recipe_id=OuterRef('recipe_id')
+    ).values('recipe_id').annotate(total=Count('id')).values('total')
+    candidates = IngredientRecipe.objects.filter(
+        ingredient_id__in=ingredients.values('ingredient_id')
+    ).exclude(
+        recipe_id=recipe_id
+    ).values('recipe_id').annotate(
+        shared=Count('id'),
+        total=Subquery(candidate_size)
+    )
+    return heapq.nlargest(top_k, (
+        (row['shared'] / (size + row['total'] - row['shared']),
+         row['recipe_id'])
+        for row in candidates
+    ))
+
+
+def similarity_rows(recipe_id):
+    """Строки индекса для рецепта: его собственный топ похожих."""
+    return [
+        RecipeSimilarity(
+            recipe_id=recipe_id, similar_id=similar_id, score=score
+        )
+        for score, similar_id in similar_scores(recipe_id)
+    ]
+
+
+def refresh_recipe(recipe_id):
+    """
+    Пересчёт похожих рецептов после изменения состава.
+    Сходство с рецептом меняется у всех, кто держал его в своём топе,
+    и у всех, кто делит с ним ингредиенты сейчас: их топы
+    пересчитываются целиком, как при rebuild.
+    """
+    with transaction.atomic():
+        affected = {recipe_id}
+        affected.update(RecipeSimilarity.objects.filter(
+            similar_id=recipe_id
+        ).values_list('recipe_id', flat=True))
+        affected.update(IngredientRecipe.objects.filter(
+            ingredient_id__in=IngredientRecipe.objects.filter(
+                recipe_id=recipe_id
+            ).values('ingredient_id')
+        ).values_list('recipe_id', flat=True).distinct())
+        RecipeSimilarity.objects.filter(recipe_id__in=affected).delete()
+        RecipeSimilarity.objects.bulk_create([
+            row for affected_id in affected
+            for row in similarity_rows(affected_id)
+        ])
+
+
+def rebuild(batch_size=1000):
+    """Полная перестройка индекса похожих рецептов."""
+    total = 0
+    with transaction.atomic():
+        RecipeSimilarity.objects.all().delete()
+        batch = []
+        for recipe_id in Recipe.objects.values_list(
+            'id', flat=True
+        ).iterator():
+            batch.extend(similarity_rows(recipe_id))
+            if len(batch) >= batch_size:
+                RecipeSimilarity.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        RecipeSimilarity.objects.bulk_create(batch)
+    return total + len(batch)
@@ -0,0 +1,170 @@
+from datetime import timedelta
+
+from django.contrib import admin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.shortcuts import render
+from django.utils import timezone
+
+from recipes.models import (AuthorStats, CartSize, DailyRecipeStats, Follow,
+                            IngredientRecipe, IngredientUsage, Recipe,
+                            ShoppingCart, StatsWatermark)
+
+KEYS_CHUNK = 1000
+TOP_SIZE = 20
+DAYS = 30
+CART_BUCKETS = ((1, 5), (6, 10), (11, 20), (21, None))
+
+# Сводки со счётчиком по ключу: имя отметки, исходная модель и её поле-ключ,
+# модель сводки и её поле-счётчик.
+COUNTERS = (
+    ('ingredient_usage', IngredientRecipe, 'ingredient_id', IngredientUsage, 'recipes'),
+    ('author_recipes', Recipe, 'author_id', AuthorStats, 'recipes'),
+    ('author_followers', Follow, 'author_id', AuthorStats, 'followers'),
+    ('cart_sizes', ShoppingCart, 'author_id', CartSize, 'recipes'),
+)
+
+
+def chunks(items, size=KEYS_CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def store_counts(summary, field, counts):
+    """Запись счётчиков в сводку: обновление существующих строк и вставка новых."""
+    existing = summary.objects.in_bulk(list(counts))
+    updated, created = [], []
+    for key, value in counts.items():
+        row = existing.get(key)
+        if row is None:
+            created.append(summary(pk=key, **{field: value}))
+        elif getattr(row, field) != value:
+            setattr(row, field, value)
+            updated.append(row)
+    summary.objects.bulk_create(created, batch_size=KEYS_CHUNK)
+    summary.objects.bulk_update(updated, [field], batch_size=KEYS_CHUNK)
+
+
+def count_by(source, key, keys=None):
+    """Число строк исходной таблицы по ключу, по индексу ключа."""
+    queryset = source.objects.all()
+    if keys is not None:
+        queryset = queryset.filter(**{f'{key}__in': keys})
+    return dict(
+        queryset.order_by().values_list(key).annotate(total=Count('id'))
+    )
+
+
+def refresh_counter(name, source, key, summary, field, full):
+    """
+    Обновление сводки со счётчиком. В инкрементальном режиме
+    пересчитываются только ключи из строк с id выше отметки,
+    полный режим пересчитывает все ключи.
+    Возвращает число пересчитанных ключей.
+    """
+    watermark, _ = StatsWatermark.objects.select_for_update().get_or_create(name=name)
+    upper = source.objects.aggregate(last=Max('id'))['last'] or 0
+    if full:
+        summary.objects.update(**{field: 0})
+        counts = count_by(source, key)
+        for keys in chunks(counts):
+            store_counts(summary, field, {pk: counts[pk] for pk in keys})
+        affected = len(counts)
+    else:
+        keys = set(source.objects.filter(
+            id__gt=watermark.last_id, id__lte=upper
+        ).values_list(key, flat=True).distinct())
+        for part in chunks(keys):
+            counts = count_by(source, key, part)
+            store_counts(summary, field, {pk: counts.get(pk, 0) for pk in part})
+        affected = len(keys)
+    watermark.last_id = upper
+    watermark.save()
+    return affected
+
+
+def refresh_daily(full):
+    """
+    Новые рецепты по дням: рецепты с id выше отметки прибавляются
+    к счётчикам своих дней, полный режим пересчитывает все дни.
+    """
+    watermark, _ = StatsWatermark.objects.select_for_update().get_or_create(name='daily_recipes')
+    upper = Recipe.objects.aggregate(last=Max('id'))['last'] or 0
+    recipes = Recipe.objects.filter(id__lte=upper)
+    if full:
+        DailyRecipeStats.objects.all().delete()
+    else:
+        recipes = recipes.filter(id__gt=watermark.last_id)
+    days = dict(recipes.order_by().annotate(
+        day=TruncDate('pub_date')
+    ).values_list('day').annotate(total=Count('id')))
+    existing = DailyRecipeStats.objects.in_bulk(list(days))
+    DailyRecipeStats.objects.bulk_create(
+        DailyRecipeStats(date=day, recipes=total)
+        for day, total in days.items() if day not in existing
+    )
+    for day in existing:
+        DailyRecipeStats.objects.filter(date=day).update(
+            recipes=F('recipes') + days[day]
+        )
+    watermark.last_id = upper
+    watermark.save()
+    return len(days)
+
+
+def refresh(full=False):
+    """
+    Обновление всех сводок, каждая — в своей транзакции.
+    Удаления строк инкрементальный режим видит только у ключей
+    с новыми строками, остальное исправляет полный пересчёт.
+    """
+    results = {}
+    for name, source, key, summary, field in COUNTERS:
+        with transaction.atomic():
+            results[name] = refresh_counter(name, source, key, summary, field, full)
+    with transaction.atomic():
+        results['daily_recipes'] = refresh_daily(full)
+    return results
+
+
+@staff_member_required
+def stats_view(request):
+    """Страница админки со сводной статистикой из таблиц сводок."""
+    since = timezone.now().date() - timedelta(days=DAYS)
+    carts = CartSize.objects.filter(recipes__gt=0)
+    cart_buckets = carts.aggregate(**{
+        f'bucket_{index}': Count(
+            'pk', filter=Q(recipes__gte=low) & (Q(recipes__lte=high) if high else Q())
+        )
+        for index, (low, high) in enumerate(CART_BUCKETS)
+    })
+    context = admin.site.each_context(request)
+    context.update({
+        'title': 'Статистика',
+        'totals': {
+            'recipes': DailyRecipeStats.objects.aggregate(total=Sum('recipes'))['total'] or 0,
+            'authors': AuthorStats.objects.filter(recipes__gt=0).count(),
+            'follows': AuthorStats.objects.aggregate(total=Sum('followers'))['total'] or 0,
+            'ingredients': IngredientUsage.objects.filter(recipes__gt=0).count(),
+        },
+        'ingredients': IngredientUsage.objects.select_related(
+            'ingredient'
+        ).order_by('-recipes')[:TOP_SIZE],
+        'authors_by_recipes': AuthorStats.objects.select_related(
+            'author'
+        ).order_by('-recipes')[:TOP_SIZE],
+        'authors_by_followers': AuthorStats.objects.select_related(
+            'author'
+        ).order_by('-followers')[:TOP_SIZE],
+        'days': DailyRecipeStats.objects.filter(date__gte=since).order_by('-date'),
+        'carts': carts.aggregate(average=Avg('recipes'), largest=Max('recipes'), users=Count('pk')),
+        'cart_buckets': [
+            (f'{low}–{high}' if high else f'{low}+', cart_buckets[f'bucket_{index}'])
+            for index, (low, high) in enumerate(CART_BUCKETS)
+        ],
+        'watermarks': StatsWatermark.objects.order_by('name'),
+    })
+    return render(request, 'admin/stats.html', context)
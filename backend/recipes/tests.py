@@ -0,0 +1,77 @@
+from django.test import TestCase
+
+from recipes.models import (Ingredient, IngredientRecipe, Recipe,
+                            RecipeSimilarity)
+from recipes.similarity import TOP_K, rebuild, refresh_recipe
+from users.models import User
+
+
+class SimilarityRefreshTest(TestCase):
+    """Инкрементальное обновление индекса совпадает с полной перестройкой."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(
+            username='similar', email='similar@example.com',
+            first_name='Тест', last_name='Тестов', password='-'
+        )
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'сходство {i}', measurement_unit='г')
+            for i in range(8)
+        )
+        cls.ingredients = list(Ingredient.objects.order_by('id'))
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                cooking_time=10, image='recipes/similar.png'
+            )
+            for number in range(16)
+        )
+        cls.recipes = list(Recipe.objects.order_by('id'))
+        # Больше TOP_K рецептов с общими ингредиентами и разной степенью
+        # пересечения: топы не симметричны.
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                recipe=recipe, ingredient=cls.ingredients[offset], amount=10
+            )
+            for index, recipe in enumerate(cls.recipes)
+            for offset in range(8)
+            if (index >> (offset % 4)) & 1 or offset == index % 8
+        )
+
+    def index(self):
+        return sorted(RecipeSimilarity.objects.values_list(
+            'recipe_id', 'similar_id', 'score'
+        ))
+
+    def change_ingredients(self, recipe, ingredients):
+        IngredientRecipe.objects.filter(recipe=recipe).delete()
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients
+        )
+        refresh_recipe(recipe.id)
+
+    def assert_matches_rebuild(self):
+        refreshed = self.index()
+        rebuild()
+        self.assertEqual(refreshed, self.index())
+        for recipe in self.recipes:
+            self.assertLessEqual(
+                RecipeSimilarity.objects.filter(recipe=recipe).count(), TOP_K
+            )
+
+    def test_ingredient_edit(self):
+        rebuild()
+        recipe = self.recipes[5]
+        self.assertTrue(RecipeSimilarity.objects.filter(similar=recipe).exists())
+        self.change_ingredients(recipe, self.ingredients[4:7])
+        self.assert_matches_rebuild()
+
+    def test_repeated_edits(self):
+        rebuild()
+        for number, recipe in enumerate(self.recipes[:6]):
+            start = number % 5
+            self.change_ingredients(recipe, self.ingredients[start:start + 3])
+        self.change_ingredients(self.recipes[0], [])
+        self.assert_matches_rebuild()
@@ -1,9 +1,8 @@
-from rest_framework import serializers, status
-from rest_framework.exceptions import ValidationError
-from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
 from recipes.models import Follow, Recipe
 from users.models import User
 import api.serializers
+from api.membership import FOLLOWS, memberships
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -22,8 +21,10 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """Проверка, подписан ли текущий пользователь на данного автора."""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context.get('request').user
-        return not user.is_anonymous and Follow.objects.filter(user=user, author=obj).exists()
+        return not user.is_anonymous and memberships.get(user.id).has(FOLLOWS, obj.id)
 
     def create(self, validated_data):
         """Создание нового пользователя с шифрованием пароля."""
@@ -49,40 +50,46 @@ class FollowSerializer(serializers.ModelSerializer):
     def get_is_subscribed(self, obj):
         """Проверка, подписан ли текущий пользователь на автора."""
         user = self.context.get('request').user
-        return not user.is_anonymous and Follow.objects.filter(user=obj.user, author=obj.author).exists()
+        return not user.is_anonymous and obj.user_id == user.id
+
+    def get_author_recipes(self, obj):
+        """Рецепты автора: загруженные заранее или запросом к БД."""
+        recipes = getattr(obj.author, 'prefetched_recipes', None)
+        if recipes is None:
+            recipes = Recipe.objects.filter(author=obj.author)
+        return recipes
 
     def get_recipes(self, obj):
         """Получение списка рецептов автора с учетом лимита."""
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=obj.author)
+        recipes = self.get_author_recipes(obj)
         if limit and limit.isdigit():
             recipes = recipes[:int(limit)]
         return api.serializers.RecipeMiniSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
         """Получение количества рецептов автора."""
-        return Recipe.objects.filter(author=obj.author).count()
-
-    def validate(self, data):
-        """Валидация данных перед созданием подписки."""
-        author = self.context.get('author')
-        user = self.context.get('request').user
-        if Follow.objects.filter(author=author, user=user).exists():
-            raise ValidationError('Вы уже подписаны на этого пользователя!', code=status.HTTP_400_BAD_REQUEST)
-        if user == author:
-            raise ValidationError('Невозможно подписаться на себя!', code=status.HTTP_400_BAD_REQUEST)
-        return data
+        recipes_count = getattr(obj, 'recipes_count', None)
+        if recipes_count is None:
+            return Recipe.objects.filter(author=obj.author).count()
+        return recipes_count
 
 
 class UserAvatarSerializer(serializers.ModelSerializer):
     """Сериализатор для обновления аватара пользователя."""
-    avatar = Base64ImageField()
 
     class Meta:
         model = User
         fields = ('avatar',)
 
+    def get_fields(self):
+        """Поле avatar из drf_extra_fields: импорт откладывается до первой записи."""
+        from drf_extra_fields.fields import Base64ImageField
+        fields = super().get_fields()
+        fields['avatar'] = Base64ImageField()
+        return fields
+
     def update(self, instance, validated_data):
         """Обновление аватара пользователя."""
         instance.avatar = validated_data['avatar']
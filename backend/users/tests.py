@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.membership import memberships
+from api.tests import print_query_counts
+from recipes.models import Follow
+from users.models import User
+
+# Ограничение частоты не влияет на число запросов, но остановило бы серию.
+NO_THROTTLING = override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}
+})
+
+
+@NO_THROTTLING
+class UsersQueryBudgetTest(TestCase):
+    """
+    Список пользователей выполняет одинаковое число запросов на любой странице.
+    Замеры выводятся таблицей при manage.py test -v 2.
+    """
+    limits = (6, 30)
+    results = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        print_query_counts(
+            'Запросов на /api/users/:',
+            [f'limit={limit}' for limit in cls.limits],
+            [
+                (name, [counts[limit] for limit in cls.limits])
+                for name, counts in sorted(cls.results.items())
+            ]
+        )
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(
+                username=f'user{i}', email=f'user{i}@example.com',
+                first_name='Тест', last_name='Тестов', password='-'
+            )
+            for i in range(40)
+        )
+        cls.users = list(User.objects.order_by('id'))
+        Follow.objects.bulk_create(
+            Follow(user=cls.users[0], author=author)
+            for author in cls.users[1::2]
+        )
+
+    def setUp(self):
+        cache.clear()
+        memberships.entries.clear()
+
+    def count_queries(self, client, limit):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/users/?limit={limit}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), limit)
+        return len(queries)
+
+    def assert_constant(self, client, name):
+        counts = {limit: self.count_queries(client, limit) for limit in self.limits}
+        self.results[name] = counts
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_anonymous(self):
+        self.assert_constant(APIClient(), 'anonymous')
+
+    def test_authenticated(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        self.assert_constant(client, 'authenticated')
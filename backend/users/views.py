@@ -5,16 +5,20 @@ from rest_framework.decorators import action
 from djoser.serializers import SetPasswordSerializer
 from rest_framework.permissions import IsAuthenticated
 from api.paginations import ApiPagination
+from django.db.models import (BooleanField, Count, Exists, OuterRef, Prefetch,
+                              Subquery, Value)
 from django.shortcuts import get_object_or_404
 
-from recipes.models import Follow
+from recipes.models import Follow, Recipe
 from users.models import User
 from users.serializers import (
     FollowSerializer,
     UserSerializer,
     UserAvatarSerializer
 )
+from api.membership import FOLLOWS, memberships
 from api.permissions import IsCurrentUserOrAdminOrReadOnly
+from api.services import create_if_absent
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -24,6 +28,17 @@ class UserViewSet(viewsets.ModelViewSet):
     pagination_class = ApiPagination
     serializer_class = UserSerializer
 
+    def get_queryset(self):
+        """Пользователи с признаком подписки текущего пользователя."""
+        user = self.request.user
+        if user.is_anonymous:
+            is_subscribed = Value(False, output_field=BooleanField())
+        else:
+            is_subscribed = Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk'))
+            )
+        return User.objects.annotate(is_subscribed=is_subscribed).order_by('id')
+
     def perform_update(self, serializer):
         """Сохранение обновленного пользователя с учетом аватара."""
         if 'avatar' in self.request.FILES:
@@ -61,24 +76,49 @@ class UserViewSet(viewsets.ModelViewSet):
         user = self.request.user
 
         if request.method == 'POST':
-            serializer = FollowSerializer(
-                data=request.data,
-                context={'request': request, 'author': author}
-            )
-            if serializer.is_valid(raise_exception=True):
-                serializer.save(author=author, user=user)
-                return Response({'Подписка успешно создана': serializer.data}, status=status.HTTP_201_CREATED)
+            if user == author:
+                return Response({'errors': 'Невозможно подписаться на себя!'}, status=status.HTTP_400_BAD_REQUEST)
+            follow = create_if_absent(Follow, author=author, user=user)
+            if follow is None:
+                return Response({'errors': 'Вы уже подписаны на этого пользователя!'}, status=status.HTTP_400_BAD_REQUEST)
+            memberships.changed(user.id, FOLLOWS, [author.id], added=True)
+            serializer = FollowSerializer(follow, context={'request': request})
+            return Response({'Подписка успешно создана': serializer.data}, status=status.HTTP_201_CREATED)
 
-        if Follow.objects.filter(author=author, user=user).exists():
-            Follow.objects.get(author=author, user=user).delete()
+        deleted, _ = Follow.objects.filter(author=author, user=user).delete()
+        if deleted:
+            memberships.changed(user.id, FOLLOWS, [author.id], added=False)
             return Response('Успешная отписка', status=status.HTTP_204_NO_CONTENT)
-
         return Response({'errors': 'Объект не найден'}, status=status.HTTP_404_NOT_FOUND)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        """Отображение всех подписок текущего пользователя."""
-        follows = Follow.objects.filter(user=self.request.user)
+        """
+        Отображение всех подписок текущего пользователя.
+        Число рецептов считается в БД, а загружаются только
+        recipes_limit последних рецептов каждого автора.
+        """
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'cooking_time', 'author_id'
+        )
+        limit = request.query_params.get('recipes_limit', '')
+        if limit.isdigit():
+            recipes = recipes.filter(id__in=Subquery(
+                Recipe.objects.filter(
+                    author_id=OuterRef('author_id')
+                ).order_by('-id').values('id')[:int(limit)]
+            ))
+        follows = Follow.objects.filter(
+            user=self.request.user
+        ).select_related('author').annotate(
+            recipes_count=Count('author__recipe')
+        ).prefetch_related(
+            Prefetch(
+                'author__recipe_set',
+                queryset=recipes,
+                to_attr='prefetched_recipes'
+            )
+        ).order_by('-id')
         pages = self.paginate_queryset(follows)
         serializer = FollowSerializer(pages, many=True, context={'request': request})
         return self.get_paginated_response(serializer.data)